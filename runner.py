@@ -1,78 +1,198 @@
-import asyncio
-import inspect
 import json
 import os
-from importlib.util import module_from_spec, spec_from_file_location
+from collections.abc import Generator
+from contextlib import AsyncExitStack, contextmanager
+from functools import cache
 from pathlib import Path
+from typing import Any
 
 import allure
 import pytest
-import yaml
-from openai import AsyncOpenAI
 
-from src.ai_model_client import ModelInterface
-from src.schema.client_schema import ClientModel
-from src.schema.json_schema import Schema
+from src.exceptions.custom_exceptions import FunctionLoadError
+from src.profiling import Profiler, StageProfile
+from src.schema.bundle_index import BundleIndex
 from src.schema.py_schema import FunctionSchema
+from src.schema.registry import SchemaRegistry
+from src.sync import loader
+from src.sync.batch import SyncPair, discover_pairs, run_batch, validate_bundle
+from src.sync.cache import SyncCache
 
 
 def load_yaml_conf(file_path):
+    import yaml
+
     with open(file_path, encoding="utf-8") as f:
         return yaml.safe_load(f)
 
 
-def get_function_from_py(py_file: Path, func_name: str):
-    spec = spec_from_file_location(func_name, py_file.absolute())
-    if spec is None or spec.loader is None:
-        pytest.fail(f"❌ Не удалось загрузить модуль из {py_file}")
-    mod = module_from_spec(spec)
-    spec.loader.exec_module(mod)
-    if not hasattr(mod, func_name):
-        pytest.fail(f"❌ Функция '{func_name}' не найдена в файле!")
-    return getattr(mod, func_name)
+def inspect_py_function(py_file: Path, func_name: str):
+    try:
+        return loader.inspect_function(py_file, func_name, loader.get_inspect_mode())
+    except FunctionLoadError as e:
+        pytest.fail(f"❌ {e.message}")
+
+
+def attach_query_result(name: str, res: Any) -> Any:
+    """Прикладывает к отчёту результат одного запроса сразу по его готовности.
+
+    Возвращает `res` или исключение, если ответ не удалось разобрать.
+    """
+    if isinstance(res, Exception):
+        allure.attach(
+            f"{type(res).__name__}: {str(res)}",
+            name=f"❌ {name}",
+            attachment_type=allure.attachment_type.TEXT,
+        )
+        return res
+
+    try:
+        message = res.get("message") if isinstance(res, dict) else res
+        usage = res.get("usage", {}) if isinstance(res, dict) else {}
+        timings = res.get("timings", {}) if isinstance(res, dict) else {}
+
+        if usage:
+            allure.attach(
+                json.dumps({**usage, **timings}, indent=2, ensure_ascii=False),
+                name=f"📊 Usage - {name}",
+                attachment_type=allure.attachment_type.JSON,
+            )
+            allure.dynamic.parameter(f"Tokens - {name}", usage.get("total_tokens", 0))
+
+        if message:
+            if hasattr(message, "model_dump_json"):
+                content = message.model_dump_json(indent=2)
+            elif hasattr(message, "dict"):
+                content = json.dumps(message.dict(), indent=2)
+            else:
+                content = str(message)
+
+            allure.attach(
+                content,
+                name=f"✅ Response - {name}",
+                attachment_type=allure.attachment_type.JSON,
+            )
+
+    except Exception as e:
+        allure.attach(
+            f"Error parsing result: {type(e).__name__}: {str(e)}",
+            name=f"⚠️ Parse Error - {name}",
+            attachment_type=allure.attachment_type.TEXT,
+        )
+        return e
+
+    return res
+
+
+def attach_stage_profile(profile: StageProfile) -> None:
+    for title, table in profile.tables.items():
+        allure.attach(
+            table,
+            name=f"⏱ {title} - {profile.name}",
+            attachment_type=allure.attachment_type.TEXT,
+        )
+    for title, (content, extension) in profile.files.items():
+        allure.attach(content, name=f"⏱ {title} - {profile.name}", extension=extension)
+
+
+@contextmanager
+def profiled_step(profiler: Profiler, title: str) -> Generator[None, None, None]:
+    """`allure.step`, профиль которого (при `INPUT_PROFILE`) прикладывается к шагу."""
+    with allure.step(title), profiler.stage(title):
+        yield
+
+
+@cache
+def get_batch_pairs() -> tuple[SyncPair, ...]:
+    root = os.environ.get("INPUT_ROOT_PATH")
+    return tuple(discover_pairs(Path(root))) if root else ()
+
+
+@cache
+def get_bundle_names() -> tuple[str, ...]:
+    bundle = os.environ.get("INPUT_BUNDLE_PATH")
+    return tuple(BundleIndex.load(Path(bundle)).names) if bundle else ()
+
+
+def pytest_generate_tests(metafunc):
+    if "sync_pair" in metafunc.fixturenames:
+        pairs = get_batch_pairs()
+        metafunc.parametrize("sync_pair", pairs, ids=[p.pair_id for p in pairs])
+    if "bundle_entry" in metafunc.fixturenames:
+        names = get_bundle_names()
+        metafunc.parametrize("bundle_entry", names, ids=names)
+
+
+@pytest.fixture(scope="module")
+def batch_sync_results():
+    workers = int(os.environ.get("INPUT_WORKERS") or 0) or None
+    return run_batch(
+        list(get_batch_pairs()),
+        workers,
+        SyncCache.from_env(),
+        loader.get_inspect_mode(),
+    )
+
+
+@pytest.fixture(scope="session")
+def profiler() -> Profiler:
+    return Profiler.from_env(sink=attach_stage_profile)
+
+
+@pytest.fixture(scope="session")
+def schema_registry() -> SchemaRegistry:
+    return SchemaRegistry()
+
+
+@pytest.fixture(scope="module")
+def bundle_results():
+    workers = int(os.environ.get("INPUT_WORKERS") or 0) or None
+    return validate_bundle(Path(os.environ["INPUT_BUNDLE_PATH"]), workers)
 
 
 @allure.epic("Валидация функций")
 @allure.feature("Синхронизация")
 @allure.story("Анализ кода и JSON схемы")
 @allure.severity(allure.severity_level.CRITICAL)
-def test_local_function_sync():
+def test_local_function_sync(schema_registry: SchemaRegistry, profiler: Profiler):
     func_path = os.environ.get("INPUT_FUNC_PATH")
     schema_path = os.environ.get("INPUT_SCHEMA_PATH")
 
     if not func_path or not schema_path:
+        if os.environ.get("INPUT_ROOT_PATH"):
+            pytest.skip("Пакетный режим: пары проверяются в test_batch_function_sync")
+        if os.environ.get("INPUT_BUNDLE_PATH"):
+            pytest.skip("Пакетный режим: схемы набора проверяются в test_bundle_schema")
         pytest.fail("Проверьте переменные INPUT_FUNC_PATH и INPUT_SCHEMA_PATH")
 
     py_file = Path(func_path)
     json_file = Path(schema_path)
-    func_name = py_file.stem
+    func_name = loader.get_func_name(py_file)
 
-    with allure.step(f"Загрузка JSON схемы: {json_file.name}"):
-        with open(json_file, encoding="utf-8") as f:
-            data = json.load(f)
-            schema_dict = (
-                data[func_name]
-                if isinstance(data, dict) and func_name in data
-                else data
-            )
-            schema = Schema.model_validate(schema_dict)
-            allure.attach(
-                json.dumps(schema_dict, indent=2, ensure_ascii=False),
-                "Schema JSON",
-                allure.attachment_type.JSON,
-            )
+    with profiled_step(profiler, f"Загрузка JSON схемы: {json_file.name}"):
+        try:
+            schema = schema_registry.get(json_file, func_name)
+        except FunctionLoadError as e:
+            pytest.fail(f"❌ {e.message}")
+        allure.attach(
+            json.dumps(
+                schema.model_dump(by_alias=True, exclude_unset=True),
+                indent=2,
+                ensure_ascii=False,
+            ),
+            "Schema JSON",
+            allure.attachment_type.JSON,
+        )
 
-    with allure.step(f"Инспекция Python функции: {func_name}"):
-        func = get_function_from_py(py_file, func_name)
-        source_code = inspect.getsource(func)
-        sig = inspect.signature(func)
+    with profiled_step(profiler, f"Инспекция Python функции: {func_name}"):
+        source_code, parameters = inspect_py_function(py_file, func_name)
         allure.attach(source_code, "Source Code", allure.attachment_type.TEXT)
 
-    with allure.step("Проверка соответствия аргументов коду"):
+    with profiled_step(profiler, "Проверка соответствия аргументов коду"):
         try:
             FunctionSchema.model_validate(
                 {
-                    "arguments": sig.parameters,
+                    "arguments": parameters,
                     "json_schema": schema,
                     "source_code": source_code,
                 }
@@ -83,56 +203,353 @@ def test_local_function_sync():
             raise
 
 
+@allure.epic("Валидация функций")
+@allure.feature("Синхронизация")
+@allure.story("Пакетная проверка директории")
+@allure.severity(allure.severity_level.CRITICAL)
+def test_batch_function_sync(sync_pair: SyncPair, batch_sync_results):
+    result = batch_sync_results[sync_pair.pair_id]
+    allure.dynamic.title(f"Синхронизация: {sync_pair.pair_id}")
+    allure.dynamic.parameter("Duration, s", round(result.duration, 3))
+    allure.dynamic.parameter("Cached", result.cached)
+
+    with allure.step(f"Загрузка JSON схемы: {sync_pair.schema_path.name}"):
+        if result.schema_json:
+            allure.attach(
+                result.schema_json, "Schema JSON", allure.attachment_type.JSON
+            )
+
+    with allure.step(f"Инспекция Python функции: {sync_pair.func_name}"):
+        if result.source_code:
+            allure.attach(
+                result.source_code, "Source Code", allure.attachment_type.TEXT
+            )
+        if result.args_map:
+            allure.attach(
+                "\n".join(str(arg) for arg in result.args_map),
+                "Arguments map",
+                allure.attachment_type.TEXT,
+            )
+
+    with allure.step("Проверка соответствия аргументов коду"):
+        if result.passed:
+            allure.dynamic.description("Синхронизация кода и схемы подтверждена ✅")
+            return
+
+        allure.attach(
+            result.errors_report, "Validation Error", allure.attachment_type.TEXT
+        )
+        result.raise_for_errors()
+
+
+@allure.epic("Валидация функций")
+@allure.feature("Схемы")
+@allure.story("Пакетная проверка набора схем")
+@allure.severity(allure.severity_level.CRITICAL)
+def test_bundle_schema(bundle_entry: str, bundle_results):
+    result = bundle_results[bundle_entry]
+    allure.dynamic.title(f"Схема: {bundle_entry}")
+    allure.dynamic.parameter("Duration, s", round(result.duration, 3))
+
+    with allure.step("Валидация JSON схемы"):
+        if result.schema_json:
+            allure.attach(
+                result.schema_json, "Schema JSON", allure.attachment_type.JSON
+            )
+        if result.passed:
+            allure.dynamic.description("Схема корректна ✅")
+            return
+
+        allure.attach(
+            result.errors_report, "Validation Error", allure.attachment_type.TEXT
+        )
+        result.raise_for_errors()
+
+
 @pytest.mark.asyncio
 @allure.epic("Валидация функций")
 @allure.feature("Инференс")
 @allure.story("Вызов OpenAI API")
 @allure.severity(allure.severity_level.NORMAL)
-async def test_ai_inference():
+async def test_ai_inference(
+    schema_registry: SchemaRegistry,
+    profiler: Profiler,
+    tmp_path_factory: pytest.TempPathFactory,
+):
+    # SDK и модули инференса грузятся только здесь: проверка синхронизации
+    # схем не должна платить за их импорт при каждом запуске action
+    from pydantic import SecretStr
+
+    from src.ai_model_client import ModelInterface
+    from src.exceptions.custom_exceptions import RunAbortedError
+    from src.inference.batch import BatchRunner
+    from src.inference.client_pool import ClientPool
+    from src.inference.limiter import build_limiter
+    from src.inference.metrics import MetricsCollector
+    from src.inference.pipeline import (
+        QueryResult,
+        ResultsSummary,
+        ResultsWriter,
+        run_pipeline,
+    )
+    from src.inference.request_template import RequestTemplate
+    from src.inference.router_pool import Route, RouterPool
+    from src.inference.run_guard import RunGuard
+    from src.inference.stub_server import StubServer, load_stub_config
+    from src.schema.client_schema import ClientModel
+
     conf_path = os.environ.get("INPUT_CONFIG_PATH")
     schema_path = os.environ.get("INPUT_SCHEMA_PATH")
 
     if not conf_path or not schema_path:
         pytest.fail("Проверьте переменные INPUT_CONFIG_PATH и INPUT_SCHEMA_PATH")
 
-    with open(schema_path, encoding="utf-8") as f:
-        s_data = json.load(f)
-        s_dict = list(s_data.values())[0] if isinstance(s_data, dict) else s_data
-        schema = Schema.model_validate(s_dict)
+    report_mode = os.environ.get("INPUT_REPORT_MODE") or "full"
+    if report_mode not in ("full", "compact"):
+        pytest.fail(
+            f"INPUT_REPORT_MODE: ожидается full или compact, получено {report_mode}"
+        )
+    compact_report = report_mode == "compact"
+    allure.dynamic.parameter("Report mode", report_mode)
+
+    with profiled_step(profiler, "Загрузка набора функций (tools)"):
+        tool_names = os.environ.get("INPUT_TOOL_NAMES")
+        tools = schema_registry.bundle(
+            Path(schema_path),
+            (
+                [n.strip() for n in tool_names.split(",") if n.strip()]
+                if tool_names
+                else None
+            ),
+        )
+        allure.dynamic.parameter("Tools", len(tools))
 
     raw_conf = load_yaml_conf(conf_path)
-
-    with allure.step("Валидация конфигурации клиента"):
+    if corpus_path := os.environ.get("INPUT_CORPUS_PATH"):
+        raw_conf.pop("queries", None)
+        raw_conf["corpus"] = {**(raw_conf.get("corpus") or {}), "path": corpus_path}
+    if corpus_range := os.environ.get("INPUT_CORPUS_RANGE"):
+        if not (raw_conf.get("corpus") or {}).get("path"):
+            pytest.fail(
+                "INPUT_CORPUS_RANGE задан без набора запросов: укажите "
+                "INPUT_CORPUS_PATH или corpus.path в конфигурации"
+            )
+        start, _, stop = corpus_range.partition(":")
+        raw_conf.setdefault("corpus", {}).update(
+            start=int(start or 0), stop=int(stop) if stop else None
+        )
+    if run_mode := os.environ.get("INPUT_RUN_MODE"):
+        raw_conf["mode"] = run_mode
+    if routing := os.environ.get("INPUT_ROUTING"):
+        raw_conf["routing"] = routing
+    if replay_mode := os.environ.get("INPUT_REPLAY_MODE"):
+        raw_conf.setdefault("replay_cache", {})["mode"] = replay_mode
+
+    with profiled_step(profiler, "Валидация конфигурации клиента"):
         from unittest.mock import patch
 
-        with patch("src.schema.client_schema.api_keys_storage") as mock_storage:
-            mock_storage.get_key_for.return_value = raw_conf.get("router", {}).get(
-                "api_key", "sk-test-mock"
+        with patch("src.schema.client_schema.get_api_keys") as mock_keys_getter:
+            mock_storage = mock_keys_getter.return_value
+            raw_routers = raw_conf.get("routers") or [raw_conf.get("router", {})]
+            mock_keys = {r.get("name"): r.get("api_key") for r in raw_routers}
+            mock_storage.get_key_for.side_effect = lambda name: SecretStr(
+                mock_keys.get(name) or "sk-test-mock"
             )
             root_config = ClientModel.model_validate(raw_conf)
 
-    router = root_config.router
-    model_settings = router.model_settings
-    sem = asyncio.Semaphore(model_settings.semaphore)
+    matrix = root_config.matrix
+    limiters = {
+        (router.config_name, model.model_id): build_limiter(model)
+        for router, model in matrix
+    }
+    templates = {
+        (router.config_name, model.model_id): RequestTemplate(router, model, tools)
+        for router, model in matrix
+    }
+    metrics_dir = os.environ.get("INPUT_METRICS_DIR")
+    metrics = MetricsCollector(
+        Path(metrics_dir) / "records.jsonl" if metrics_dir else None
+    )
+    # В пакетном режиме всё уже оплачено при отправке — останавливать нечего
+    guard = (
+        RunGuard(root_config.guard, metrics)
+        if root_config.guard.enabled and root_config.mode == "online"
+        else None
+    )
+    router_pool = (
+        RouterPool(matrix, root_config.failover)
+        if root_config.routing == "failover"
+        else None
+    )
+
+    allure.dynamic.parameter(
+        "Model", ", ".join(f"{r.config_name}/{m.model_id}" for r, m in matrix)
+    )
+
+    async with AsyncExitStack() as stack:
+        stack.callback(metrics.close)
+        stub_url = None
+        if stub_path := os.environ.get("INPUT_STUB_CONFIG"):
+            stub = await stack.enter_async_context(
+                StubServer(load_stub_config(stub_path))
+            )
+            stub_url = stub.base_url
+            allure.dynamic.parameter("Stub server", stub_url)
 
-    allure.dynamic.parameter("Model", model_settings.model_id)
+        pool = await stack.enter_async_context(
+            ClientPool(max_connections=sum(m.semaphore for _, m in matrix))
+        )
 
-    async with AsyncOpenAI(
-        api_key=router.api_key.get_secret_value(),
-        base_url=str(router.base_url),
-        timeout=router.timeout,
-        max_retries=router.max_retries,
-    ) as ai:
+        async def sem_task(router, model_settings, record):
+            ai = pool.get(router, stub_url)
+            limiter = limiters[(router.config_name, model_settings.model_id)]
+            with metrics.track(router.config_name, model_settings.model_id) as trace:
+                async with limiter.slot():
+                    trace.mark_dequeued()
+                    result = await profiler.call(
+                        f"{router.config_name}/{model_settings.model_id}",
+                        ModelInterface.call_with_functions(
+                            ai,
+                            root_config,
+                            router,
+                            model_settings,
+                            record.query,
+                            tools,
+                            trace=trace,
+                            expected=record.expected_functions,
+                            template=templates[
+                                (router.config_name, model_settings.model_id)
+                            ],
+                            on_overload=limiter.on_overload,
+                        ),
+                        trace,
+                    )
+                record.check(result["calls"])
+                return result
+
+        async def run_job(job):
+            if router_pool is None:
+                return await sem_task(*job)
+            route, record = job
+            return await router_pool.run(
+                lambda router, model: sem_task(router, model, record), route
+            )
+
+        if router_pool is not None:
+            # Каждый запрос — один раз, в ячейку, которую выберет пул роутеров
+            runs = ((Route(), record) for record in root_config.iter_queries())
+        else:
+            # Запросы чередуются по ячейкам, чтобы окно не заполнялось одной моделью
+            runs = (
+                (router, model, record)
+                for record in root_config.iter_queries()
+                for router, model in matrix
+            )
+        window = int(
+            os.environ.get("INPUT_PIPELINE_WINDOW")
+            or 2 * sum(m.semaphore for _, m in matrix)
+        )
+        results_path = Path(
+            os.environ.get("INPUT_RESULTS_PATH")
+            or tmp_path_factory.mktemp("inference") / "results.jsonl"
+        )
+
+        summary = ResultsSummary()
+        with (
+            profiled_step(
+                profiler,
+                (
+                    f"Запуск ({root_config.mode}) набора {root_config.corpus.path} "
+                    f"× {len(matrix)} моделей"
+                    if root_config.corpus
+                    else f"Запуск ({root_config.mode}) {len(root_config.queries)} запросов "
+                    f"× {len(matrix)} моделей"
+                ),
+            ),
+            ResultsWriter(results_path) as writer,
+        ):
+            if root_config.mode == "batch":
+                completed = BatchRunner(
+                    root_config, tools, lambda r: pool.get(r, stub_url), metrics
+                ).run(root_config.iter_queries())
+            else:
+                completed = run_pipeline(
+                    runs, run_job, window, stop=guard.check if guard else None
+                )
 
-        async def sem_task(q):
-            async with sem:
-                return await ModelInterface.call_with_functions(
-                    ai, root_config, router, model_settings, q, schema
+            async for done in completed:
+                if router_pool is not None:
+                    route, entry = done.job
+                    router, model = route.router, route.model
+                else:
+                    router, model, entry = done.job
+                # Запрос, не дошедший до пула роутеров, ни к одной ячейке не относится
+                cell = (router.config_name, model.model_id) if router else ("-", "-")
+                query = entry.query
+                query_preview = query[:30] + "..." if len(query) > 30 else query
+                name = f"Query {entry.index + 1}: {query_preview}"
+                if len(matrix) > 1:
+                    name = f"[{cell[0]}/{cell[1]}] {name}"
+
+                # Пропущенные после остановки прогона — только строка в results.jsonl,
+                # в компактном отчёте то же и для успешных запросов
+                if isinstance(done.result, RunAbortedError) or (
+                    compact_report and not isinstance(done.result, Exception)
+                ):
+                    res = done.result
+                else:
+                    res = attach_query_result(name, done.result)
+                record = QueryResult.build(*cell, entry.index, res)
+                writer.write(
+                    record,
+                    res.get("calls") if isinstance(res, dict) else None,
+                    entry.tags,
                 )
+                summary.add(record)
 
-        with allure.step(f"Запуск {len(root_config.queries)} запросов к AI"):
-            tasks = [sem_task(query) for query in root_config.queries]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+        allure.attach.file(results_path, "results.jsonl", extension="jsonl")
+
+    if root_config.replay:
+        root_config.replay.evict()
+
+    for (router_name, model_id), limiter in limiters.items():
+        if not limiter.history:
+            continue
+        with allure.step(f"Адаптивный лимит параллельности: {router_name}/{model_id}"):
+            allure.dynamic.parameter(
+                f"Final concurrency - {router_name}/{model_id}", limiter.limit
+            )
+            allure.attach(
+                "elapsed_s\tlimit\tin_flight\n"
+                + "\n".join(
+                    f"{s.elapsed}\t{s.limit}\t{s.in_flight}" for s in limiter.history
+                ),
+                f"Concurrency over time - {router_name}/{model_id}",
+                allure.attachment_type.TSV,
+            )
+
+    with allure.step("Телеметрия запросов"):
+        allure.attach(
+            metrics.summary_table(), "Matrix summary", allure.attachment_type.TEXT
+        )
+        allure.attach(metrics.to_json(), "metrics.json", allure.attachment_type.JSON)
+        allure.attach(
+            metrics.to_prometheus(), "metrics.prom", allure.attachment_type.TEXT
+        )
+        if router_pool is not None:
+            allure.attach(
+                router_pool.report(), "Router health", allure.attachment_type.TEXT
+            )
+        if profiler.calls:
+            allure.attach(
+                profiler.calls_table(),
+                "⏱ Model calls profile, ms",
+                allure.attachment_type.TEXT,
+            )
+        if metrics_dir:
+            out = Path(metrics_dir)
+            (out / "metrics.json").write_text(metrics.to_json(), encoding="utf-8")
+            (out / "metrics.prom").write_text(metrics.to_prometheus(), encoding="utf-8")
 
     with allure.step("Анализ результатов и расхода токенов"):
         allure.attach(
@@ -140,67 +557,31 @@ async def test_ai_inference():
             "Usage Stats (cumulative)",
             allure.attachment_type.TEXT,
         )
-        allure.dynamic.parameter("Total Tokens (cumulative)", root_config._total_token)
         allure.dynamic.parameter(
-            "Prompt Tokens (cumulative)", root_config._request_token
+            "Total Tokens (cumulative)", root_config.usage.total_tokens
+        )
+        allure.dynamic.parameter(
+            "Prompt Tokens (cumulative)", root_config.usage.prompt_tokens
         )
 
-        errors = []
-        for i, res in enumerate(results):
-            query_preview = (
-                root_config.queries[i][:30] + "..."
-                if len(root_config.queries[i]) > 30
-                else root_config.queries[i]
-            )
-            name = f"Query {i + 1}: {query_preview}"
-
-            if isinstance(res, Exception):
-                errors.append(res)
-                allure.attach(
-                    f"{type(res).__name__}: {str(res)}",
-                    name=f"❌ {name}",
-                    attachment_type=allure.attachment_type.TEXT,
-                )
-                continue
-
-            try:
-                message = res.get("message") if isinstance(res, dict) else res
-                usage = res.get("usage", {}) if isinstance(res, dict) else {}
-
-                if usage:
-                    allure.attach(
-                        json.dumps(usage, indent=2, ensure_ascii=False),
-                        name=f"📊 Usage - {name}",
-                        attachment_type=allure.attachment_type.JSON,
-                    )
-                    allure.dynamic.parameter(
-                        f"Tokens - {name}", usage.get("total_tokens", 0)
-                    )
-
-                if message:
-                    if hasattr(message, "model_dump_json"):
-                        content = message.model_dump_json(indent=2)
-                    elif hasattr(message, "dict"):
-                        content = json.dumps(message.dict(), indent=2)
-                    else:
-                        content = str(message)
-
-                    allure.attach(
-                        content,
-                        name=f"✅ Response - {name}",
-                        attachment_type=allure.attachment_type.JSON,
-                    )
+        if guard is not None:
+            allure.dynamic.parameter("Estimated cost, $", round(guard.cost, 4))
+            if guard.reason:
+                allure.dynamic.parameter("Run aborted", guard.reason)
 
-            except Exception as e:
-                errors.append(e)
-                allure.attach(
-                    f"Error parsing result: {type(e).__name__}: {str(e)}",
-                    name=f"⚠️ Parse Error - {name}",
-                    attachment_type=allure.attachment_type.TEXT,
-                )
+        allure.attach(summary.table(), "Results summary", allure.attachment_type.TEXT)
 
-        if errors:
-            error_summary = "\n".join(f"- {type(e).__name__}: {str(e)}" for e in errors)
+        failed, skipped = summary.failed, summary.skipped
+        if skipped:
+            pytest.fail(
+                f"Прогон остановлен: {guard.reason}. Пропущено запросов: {skipped}, "
+                f"завершились ошибкой: {len(failed)}"
+            )
+        if failed:
+            error_summary = "\n".join(
+                f"- [{r.router}/{r.model}] Query {r.index + 1}: {r.error}"
+                for r in failed
+            )
             pytest.fail(
-                f"Тест провален: {len(errors)} запросов завершились ошибкой:\n{error_summary}"
+                f"Тест провален: {len(failed)} запросов завершились ошибкой:\n{error_summary}"
             )
@@ -1,18 +1,29 @@
-import json
 import os
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from dataclasses import asdict
 from typing import Any
 
 import openai
-from openai import AsyncOpenAI
-from openai.types.chat import (
-    ChatCompletionFunctionToolParam,
-    ChatCompletionUserMessageParam,
-)
-from openai.types.shared_params.function_definition import FunctionDefinition
+import orjson
+from openai import AsyncOpenAI, AsyncStream
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
 
-from src.exceptions.custom_exceptions import LLMGenerationError, LLMMismatchError
+from src.exceptions.custom_exceptions import (
+    LLMGenerationError,
+    LLMMismatchError,
+    TypeMismatchJsonToPython,
+)
+from src.inference.rate_limit import RateLimiter, Reservation, estimate_prompt_tokens
+from src.inference.request_template import RequestTemplate
+from src.inference.retry import HedgeSkipped
+from src.inference.trace import RequestTrace
 from src.schema.client_schema import ClientModel, ModelConfig, RouterConfig
 from src.schema.json_schema import Schema
+from src.schema.tool_bundle import ToolBundle
+
+STREAM_FINISH_REASONS = {"stop", "length", "tool_calls", "content_filter"}
 
 
 class ModelInterface:
@@ -23,49 +34,56 @@ class ModelInterface:
         router_conf: RouterConfig,
         model_conf: ModelConfig,
         query: str,
-        json_schema: Schema,
+        json_schema: Schema | ToolBundle,
+        trace: RequestTrace | None = None,
+        expected: set[str] | None = None,
+        template: RequestTemplate | None = None,
+        on_overload: Callable[[], None] | None = None,
     ):
-        func = FunctionDefinition(
-            name=json_schema.name,
-            description=json_schema.description,
-            parameters=json_schema.parameters.model_dump(
-                by_alias=True, exclude_none=True
-            ),
+        trace = trace if trace is not None else RequestTrace()
+        bundle = ToolBundle.of(json_schema)
+        if template is None:
+            template = RequestTemplate(router_conf, model_conf, bundle)
+        expected = ModelInterface.expected_functions(bundle, expected)
+
+        response = await ModelInterface._create_completion(
+            ai_client,
+            client_conf,
+            router_conf,
+            model_conf,
+            template,
+            query,
+            trace,
+            expected_names=expected or bundle.names,
+            on_overload=on_overload,
         )
 
-        tools: list[ChatCompletionFunctionToolParam] = [
-            ChatCompletionFunctionToolParam(type="function", function=func)
-        ]
+        return ModelInterface.check_response(
+            client_conf, model_conf, response, bundle, trace, expected
+        )
 
-        model_params: dict[str, Any] = model_conf.get_params()
+    @staticmethod
+    def expected_functions(
+        bundle: ToolBundle, expected: set[str] | None
+    ) -> set[str] | None:
+        """Ожидаемые функции: из запроса, а для набора из одной схемы — она сама."""
+        if expected:
+            return expected
+        return bundle.names if len(bundle) == 1 else None
 
-        try:
-            response = await ai_client.chat.completions.create(
-                model=model_conf.model_id,
-                messages=[
-                    router_conf.system_message,
-                    ChatCompletionUserMessageParam(role="user", content=query),
-                ],
-                tools=tools,
-                tool_choice=router_conf.tool_choice,
-                timeout=router_conf.timeout,
-                **model_params,
-            )
-        except openai.APITimeoutError as e:
-            raise LLMGenerationError(
-                message=f"Превышено время ожидания ({router_conf.timeout}с)",
-                fields={"timeout": router_conf.timeout},
-            ) from e
-        except openai.APIConnectionError as e:
-            raise LLMGenerationError(
-                message=f"Ошибка сети: {e}",
-                fields={"error_type": "connection"},
-            ) from e
-        except openai.APIStatusError as e:
-            raise LLMGenerationError(
-                message=f"Ошибка API (Статус {e.status_code}): {e.message}",
-                fields={"status_code": e.status_code},
-            ) from e
+    @staticmethod
+    def check_response(
+        client_conf: ClientModel,
+        model_conf: ModelConfig,
+        response: ChatCompletion,
+        json_schema: Schema | ToolBundle,
+        trace: RequestTrace,
+        expected: set[str] | None = None,
+    ) -> dict[str, Any]:
+        """Проверки ответа модели: вызваны ожидаемые функции из набора, аргументы
+        каждого (в том числе параллельного) вызова проходят валидатор схемы."""
+        bundle = ToolBundle.of(json_schema)
+        expected = ModelInterface.expected_functions(bundle, expected)
 
         if not response.choices:
             raise LLMGenerationError(
@@ -73,40 +91,71 @@ class ModelInterface:
                 fields={"response_id": getattr(response, "id", "unknown")},
             )
 
-        # !TODO : Создание dataclass вместо прямых полей в pydantic
-        request_usage = 0
-        response_usage = 0
-        total_usage = 0
-
         if response.usage:
-            request_usage = response.usage.prompt_tokens
-            response_usage = response.usage.completion_tokens
-            total_usage = response.usage.total_tokens
+            trace.usage.add(
+                response.usage.prompt_tokens,
+                response.usage.completion_tokens,
+                response.usage.total_tokens,
+            )
 
-            client_conf._request_token += request_usage
-            client_conf._response_token += response_usage
-            client_conf._total_token += total_usage
+        if not trace.replayed:
+            client_conf.usage.add(
+                trace.usage.prompt_tokens,
+                trace.usage.completion_tokens,
+                trace.usage.total_tokens,
+            )
 
         choice = response.choices[0]
         message = choice.message
         finish_reason = choice.finish_reason
 
         if message.tool_calls:
-            called_tool = message.tool_calls[0].function.name
-            if called_tool == json_schema.name:
-                return {
-                    "message": message,
-                    "usage": {
-                        "prompt_tokens": request_usage,
-                        "completion_tokens": response_usage,
-                        "total_tokens": total_usage,
-                    },
-                }
+            called = [call.function.name for call in message.tool_calls]
+            unknown = [name for name in called if name not in bundle]
+            if unknown:
+                raise LLMMismatchError(
+                    message="Вызвана функция не из набора tools",
+                    fields={"received": unknown},
+                )
+            if expected is not None and set(called) != expected:
+                raise LLMMismatchError(
+                    message="Вызвана неверная функция",
+                    fields={"expected": sorted(expected), "received": called},
+                )
 
-            raise LLMMismatchError(
-                message="Вызвана неверная функция",
-                fields={"expected": json_schema.name, "received": called_tool},
-            )
+            calls = []
+            errors = []
+            for call in message.tool_calls:
+                try:
+                    arguments = bundle[call.function.name].arguments_validator.validate(
+                        call.function.arguments
+                    )
+                except (
+                    ExceptionGroup,
+                    LLMGenerationError,
+                    TypeMismatchJsonToPython,
+                ) as e:
+                    # Ошибки разбора (не JSON, не объект) собираются вместе с
+                    # ошибками проверки, чтобы не терять остальные вызовы
+                    errors.append(e)
+                    continue
+                calls.append({"name": call.function.name, "arguments": arguments})
+
+            if len(errors) == 1:
+                raise errors[0]
+            if errors:
+                raise ExceptionGroup(
+                    "Ошибки в аргументах параллельных вызовов:", errors
+                )
+
+            return {
+                "message": message,
+                "arguments": calls[0]["arguments"],
+                "calls": calls,
+                "usage": asdict(trace.usage),
+                "replayed": trace.replayed,
+                "timings": trace.timings,
+            }
 
         if finish_reason == "length":
             raise LLMGenerationError(
@@ -130,18 +179,254 @@ class ModelInterface:
             message="Пустой ответ от модели (ни текста, ни функций)"
         )
 
+    @staticmethod
+    async def _create_completion(
+        ai_client: AsyncOpenAI,
+        client_conf: ClientModel,
+        router_conf: RouterConfig,
+        model_conf: ModelConfig,
+        template: RequestTemplate,
+        query: str,
+        trace: RequestTrace,
+        expected_names: set[str] | None = None,
+        on_overload: Callable[[], None] | None = None,
+    ) -> ChatCompletion:
+        """Запрос к API через кэш записи/воспроизведения и клиентские лимиты."""
+        cache = client_conf.replay
+        key = template.cache_key(query) if cache else ""
+
+        if cache and cache.reads:
+            cached = cache.load(key)
+            if cached is not None:
+                trace.replayed = True
+                return cached
+            if cache.mode == "replay":
+                raise LLMGenerationError(
+                    message="Ответ не найден в кэше записи (режим replay)",
+                    fields={"key": key, "model": template.model},
+                )
+
+        body = template.render(query)
+        prompt_estimate = estimate_prompt_tokens(body)
+        limiters = client_conf.rate_limiters_for(router_conf, model_conf)
+
+        async def send(attempt: RequestTrace, hedge: bool) -> ChatCompletion:
+            # Резерв на каждую попытку: оценка промпта + max_tokens, после
+            # ответа — сверка с usage. Дубль не ждёт места в лимитах
+            reservations = await ModelInterface._reserve(
+                limiters, prompt_estimate + model_conf.max_tokens, hedge
+            )
+            attempt.rate_limit_wait = sum(r.waited for r in reservations)
+            spent_tokens = prompt_estimate
+            try:
+                if template.stream:
+                    response = await ModelInterface._stream_completion(
+                        ai_client, body, router_conf.timeout, attempt, expected_names
+                    )
+                else:
+                    response = await ai_client.post(
+                        "/chat/completions",
+                        body=body,
+                        cast_to=ChatCompletion,
+                        options={"timeout": router_conf.timeout},
+                    )
+                if response.usage:
+                    spent_tokens = response.usage.total_tokens
+                return response
+            finally:
+                for reservation in reservations:
+                    reservation.reconcile(spent_tokens)
+
+        policy = client_conf.retry_policy_for(router_conf, model_conf)
+        try:
+            response = await policy.run(send, trace, on_overload)
+        except openai.APITimeoutError as e:
+            raise LLMGenerationError(
+                message=f"Превышено время ожидания ({router_conf.timeout}с)",
+                fields={"timeout": router_conf.timeout},
+            ) from e
+        except openai.APIConnectionError as e:
+            raise LLMGenerationError(
+                message=f"Ошибка сети: {e}",
+                fields={"error_type": "connection"},
+            ) from e
+        except openai.APIStatusError as e:
+            raise LLMGenerationError(
+                message=f"Ошибка API (Статус {e.status_code}): {e.message}",
+                fields={"status_code": e.status_code},
+            ) from e
+
+        if cache and cache.writes:
+            cache.store(key, response)
+
+        return response
+
+    @staticmethod
+    async def _reserve(
+        limiters: list[RateLimiter], tokens: int, hedge: bool
+    ) -> list[Reservation]:
+        reservations: list[Reservation] = []
+        try:
+            for limiter in limiters:
+                if not hedge:
+                    reservations.append(await limiter.reserve(tokens))
+                    continue
+                # Дубль не ждёт места в лимитах
+                reservation = limiter.try_reserve(tokens)
+                if reservation is None:
+                    raise HedgeSkipped()
+                reservations.append(reservation)
+        except BaseException:
+            # Отмена между резервами роутера и модели не должна съедать лимит
+            for taken in reservations:
+                taken.release()
+            raise
+        return reservations
+
+    @staticmethod
+    async def _stream_completion(
+        ai_client: AsyncOpenAI,
+        body: bytes,
+        timeout: float,
+        trace: RequestTrace,
+        expected_names: set[str] | None = None,
+    ) -> ChatCompletion:
+        """Потоковый запрос: собирает `tool_calls` из дельт и прерывает генерацию,
+        как только модель выбрала функцию не из `expected_names`."""
+        trace.streamed = True
+        started = time.perf_counter()
+        stream = await ai_client.post(
+            "/chat/completions",
+            body=body,
+            cast_to=ChatCompletion,
+            stream=True,
+            stream_cls=AsyncStream[ChatCompletionChunk],
+            options={"timeout": timeout},
+        )
+
+        meta: dict[str, Any] = {}
+        content: list[str] = []
+        calls: dict[int, dict[str, Any]] = {}
+        finish_reason = None
+        usage = None
+
+        def check_name(call: dict[str, Any]) -> None:
+            call["checked"] = True
+            if trace.time_to_tool_name is None:
+                trace.time_to_tool_name = time.perf_counter() - started
+            if expected_names and call["name"] not in expected_names:
+                trace.aborted = True
+                raise LLMMismatchError(
+                    message="Вызвана неверная функция (генерация прервана)",
+                    fields={
+                        "expected": sorted(expected_names),
+                        "received": call["name"],
+                    },
+                )
+
+        try:
+            async for chunk in stream:
+                meta = {"id": chunk.id, "created": chunk.created, "model": chunk.model}
+                usage = chunk.usage or usage
+
+                for choice in chunk.choices:
+                    if choice.index != 0:
+                        continue
+                    delta = choice.delta
+                    if trace.time_to_first_token is None and (
+                        delta.content or delta.tool_calls
+                    ):
+                        trace.time_to_first_token = time.perf_counter() - started
+                    if delta.content:
+                        content.append(delta.content)
+
+                    for part in delta.tool_calls or []:
+                        call = calls.setdefault(
+                            part.index,
+                            {"id": None, "name": "", "arguments": "", "checked": False},
+                        )
+                        call["id"] = part.id or call["id"]
+                        if part.function is not None:
+                            call["name"] += part.function.name or ""
+                            call["arguments"] += part.function.arguments or ""
+                        # Имя считается полным, когда пошли аргументы
+                        if call["arguments"] and not call["checked"]:
+                            check_name(call)
+
+                    finish_reason = choice.finish_reason or finish_reason
+        finally:
+            await stream.close()
+
+        for call in calls.values():
+            if call["name"] and not call["checked"]:
+                check_name(call)
+
+        if finish_reason not in STREAM_FINISH_REASONS:
+            finish_reason = "tool_calls" if calls else "stop"
+
+        tool_calls = [
+            {
+                "id": call["id"] or f"call_{index}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": call["arguments"]},
+            }
+            for index, call in sorted(calls.items())
+        ]
+        return ChatCompletion.model_validate(
+            {
+                "id": meta.get("id") or "stream",
+                "object": "chat.completion",
+                "created": meta.get("created") or int(time.time()),
+                "model": meta.get("model", ""),
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": finish_reason,
+                        "message": {
+                            "role": "assistant",
+                            "content": "".join(content) or None,
+                            "tool_calls": tool_calls or None,
+                        },
+                    }
+                ],
+                "usage": usage.model_dump() if usage else None,
+            }
+        )
+
     @staticmethod
     def ci_report(results, output_path="test_results.json"):
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        """Пишет отчёт и Step Summary за один проход по `details`.
 
+        `details` может быть генератором: записи сериализуются по одной,
+        без отступов, и в памяти целиком не собираются.
+        """
+        header = {k: v for k, v in results.items() if k != "details"}
         summary_path = os.getenv("GITHUB_STEP_SUMMARY")
-        if summary_path:
-            with open(summary_path, "a", encoding="utf-8") as f:
-                f.write("### Результаты тестов\n\n")
-                for i, detail in enumerate(results.get("details", []), 1):
-                    f.write(f"#### Тест {i}\n")
-                    f.write(f"- Запрос: {detail.get('query', '')}\n")
+
+        with ExitStack() as stack:
+            f = stack.enter_context(open(output_path, "wb"))
+            summary = (
+                stack.enter_context(open(summary_path, "a", encoding="utf-8"))
+                if summary_path
+                else None
+            )
+            # Поля верхнего уровня как есть, затем массив details построчно;
+            # без details во входе нет и ключа в отчёте
+            has_details = "details" in results
+            f.write(orjson.dumps(header, default=str)[:-1])
+            if has_details:
+                f.write(b',"details":[' if header else b'"details":[')
+            if summary is not None:
+                summary.write("### Результаты тестов\n\n")
+
+            for i, detail in enumerate(results.get("details", []), 1):
+                f.write(
+                    (b",\n" if i > 1 else b"\n") + orjson.dumps(detail, default=str)
+                )
+                if summary is not None:
+                    summary.write(f"#### Тест {i}\n")
+                    summary.write(f"- Запрос: {detail.get('query', '')}\n")
                     for step in detail.get("execution_chain", []):
-                        f.write(f"- Функция: {step['function']}\n")
-                        f.write(f"- Результат: {step['result']}\n\n")
+                        summary.write(f"- Функция: {step['function']}\n")
+                        summary.write(f"- Результат: {step['result']}\n\n")
+            f.write(b"\n]}\n" if has_details else b"}\n")
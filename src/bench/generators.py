@@ -0,0 +1,85 @@
+"""Синтетические входные данные для бенчмарков: схемы, исходники и запросы."""
+
+import random
+from typing import Any
+
+# Тип свойства → значение по умолчанию, одинаково записываемое в схеме и коде
+DEFAULTS: dict[str, Any] = {
+    "string": "value",
+    "integer": 10,
+    "number": 0.5,
+    "boolean": True,
+}
+
+
+def make_schema(
+    properties: int, name: str = "bench_function", seed: int = 0
+) -> dict[str, Any]:
+    """Схема функции с `properties` аргументами всех простых типов."""
+    rng = random.Random(seed)
+    types = list(DEFAULTS)
+    props: dict[str, Any] = {}
+    for i in range(properties):
+        prop_type = types[i % len(types)]
+        prop: dict[str, Any] = {
+            "type": prop_type,
+            "description": f"Аргумент {i}: "
+            + " ".join(["описание"] * rng.randint(3, 12)),
+            "default": DEFAULTS[prop_type],
+        }
+        if prop_type == "string" and i % 3 == 0:
+            prop["enum"] = ["value", "other", f"option_{i}"]
+        props[f"arg_{i}"] = prop
+    return {
+        "name": name,
+        "description": "Синтетическая функция для бенчмарка",
+        "parameters": {
+            "type": "object",
+            "properties": props,
+            "required": [f"arg_{i}" for i in range(0, properties, 5)],
+        },
+    }
+
+
+def make_source(
+    properties: int, name: str = "bench_function", filler: int = 200
+) -> str:
+    """Исходник функции, читающей все аргументы схемы, плюс `filler` посторонних.
+
+    Значения по умолчанию совпадают со схемой `make_schema`, так что проверка
+    синхронизации проходит и замеряется без ошибок.
+    """
+    types = list(DEFAULTS)
+    lines = [f"def {name}(arguments):"]
+    for i in range(properties):
+        default = DEFAULTS[types[i % len(types)]]
+        lines.append(f"    arg_{i} = arguments.get({f'arg_{i}'!r}, {default!r})")
+    lines.append(
+        "    return {"
+        + ", ".join(f"'arg_{i}': arg_{i}" for i in range(properties))
+        + "}"
+    )
+
+    for j in range(filler):
+        lines += [
+            "",
+            "",
+            f"def helper_{j}(items, factor={j}):",
+            "    total = 0",
+            "    for item in items:",
+            "        if item % 2:",
+            "            total += item * factor",
+            "        else:",
+            "            total -= item",
+            "    return total",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def make_queries(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    cities = ["Москва", "Казань", "Самара", "Томск", "Пермь", "Омск"]
+    return [
+        f"Запрос {i}: погода в городе {rng.choice(cities)} на {rng.randint(1, 14)} дней"
+        for i in range(count)
+    ]
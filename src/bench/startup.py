@@ -0,0 +1,97 @@
+"""Замер времени импорта для проверки синхронизации схем.
+
+Запуск: `python -m src.bench.startup`; тот же порог проверяет
+`tests/test_startup.py`. Каждый замер — отдельный процесс, чтобы
+кэш модулей предыдущего замера не занижал время. Код возврата 1, если
+медиана выше бюджета (`INPUT_STARTUP_BUDGET_MS`) или путь синхронизации
+подтянул модули инференса.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# То, что импортирует action при проверке пары функция/схема
+SYNC_MODULES = (
+    "runner",
+    "src.sync.loader",
+    "src.sync.batch",
+    "src.sync.cache",
+    "src.schema.registry",
+)
+# Модули, которые должны грузиться только тестом инференса
+FORBIDDEN_MODULES = ("openai", "httpx", "yaml", "pydantic_settings")
+
+DEFAULT_RUNS = 5
+DEFAULT_BUDGET_MS = 1000.0
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+print(json.dumps({{
+    "ms": (time.perf_counter() - started) * 1000,
+    "loaded": [m for m in {forbidden!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure_once(
+    modules: tuple[str, ...] = SYNC_MODULES,
+    forbidden: tuple[str, ...] = FORBIDDEN_MODULES,
+) -> dict:
+    root = Path(__file__).resolve().parents[2]
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [str(root), os.environ.get("PYTHONPATH")])
+        ),
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(modules=modules, forbidden=forbidden)],
+        cwd=root,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def check(runs: int, budget: float) -> tuple[float, list[str]]:
+    """Медиана времени импорта и список нарушений (пустой — всё в порядке)."""
+    samples = [measure_once() for _ in range(runs)]
+    median = statistics.median(s["ms"] for s in samples)
+    loaded = sorted({m for s in samples for m in s["loaded"]})
+
+    problems = []
+    if loaded:
+        problems.append(
+            f"Путь синхронизации загрузил модули инференса: {', '.join(loaded)}"
+        )
+    if median > budget:
+        problems.append(
+            f"Время импорта {median:.1f} мс превышает бюджет {budget:.0f} мс"
+        )
+    return median, problems
+
+
+def budget_from_env() -> float:
+    return float(os.environ.get("INPUT_STARTUP_BUDGET_MS") or DEFAULT_BUDGET_MS)
+
+
+def main() -> int:
+    runs = int(os.environ.get("INPUT_STARTUP_RUNS") or DEFAULT_RUNS)
+    median, problems = check(runs, budget_from_env())
+    print(f"Импорт пути синхронизации: медиана {median:.1f} мс из {runs} замеров")
+    for problem in problems:
+        print(f"❌ {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""Бенчмарки горячих путей проверки схем и инференса.
+
+Запуск и сохранение базовой линии:
+    python -m src.bench.suite run --out bench-baseline.json
+
+Сравнение свежего прогона (или готового файла) с базовой линией:
+    python -m src.bench.suite compare bench-baseline.json [current.json]
+
+`compare` завершается с кодом 1, если пропускная способность упала или p95
+задержки вырос больше, чем на `--threshold` (доля, по умолчанию 0.2), или
+бенчмарка базовой линии нет в текущих результатах.
+Инференс замеряется против локального `StubServer` без задержек, так что
+в цифрах только накладные расходы клиента, шаблонов и проверки ответа.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from inspect import Parameter
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any
+
+from src.bench.generators import DEFAULTS, make_queries, make_schema, make_source
+from src.inference.metrics import percentile
+
+BASELINE_VERSION = 1
+DEFAULT_THRESHOLD = 0.2
+
+
+@dataclass(slots=True)
+class BenchParams:
+    properties: int = 300
+    filler: int = 2000
+    iterations: int = 30
+    queries: int = 1000
+    concurrency: int = 32
+
+
+@dataclass(slots=True)
+class Measurement:
+    iterations: int
+    ops_per_s: float
+    p50_ms: float
+    p95_ms: float
+
+    @classmethod
+    def from_samples(cls, samples: list[float], total: float) -> "Measurement":
+        ordered = sorted(samples)
+        return cls(
+            iterations=len(samples),
+            ops_per_s=round(len(samples) / total, 3) if total else 0.0,
+            p50_ms=round(percentile(ordered, 0.5) * 1000, 4),
+            p95_ms=round(percentile(ordered, 0.95) * 1000, 4),
+        )
+
+
+def measure(fn: Callable[[], Any], iterations: int, warmup: int = 2) -> Measurement:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return Measurement.from_samples(samples, time.perf_counter() - started)
+
+
+def bench_schema_validate(params: BenchParams) -> Measurement:
+    from src.schema.json_schema import Schema
+
+    data = make_schema(params.properties)
+    return measure(lambda: Schema.model_validate(data), params.iterations)
+
+
+def bench_function_sync(params: BenchParams) -> Measurement:
+    """`FunctionSchema.model_validate`: разбор AST большого файла и сверка."""
+    from src.schema.json_schema import Schema
+    from src.schema.py_schema import FunctionSchema
+
+    schema = Schema.model_validate(make_schema(params.properties))
+    source = make_source(params.properties, filler=params.filler)
+    arguments = MappingProxyType(
+        {"arguments": Parameter("arguments", Parameter.POSITIONAL_OR_KEYWORD)}
+    )
+    payload = {"arguments": arguments, "json_schema": schema, "source_code": source}
+
+    return measure(lambda: FunctionSchema.model_validate(payload), params.iterations)
+
+
+def bench_normalize_value(params: BenchParams) -> Measurement:
+    from src.schema.py_schema import normalize_value
+
+    values = [(str(v), t) for t, v in DEFAULTS.items()] * 250
+
+    def run() -> None:
+        for value, type_name in values:
+            normalize_value(value, type_name)
+
+    return measure(run, params.iterations)
+
+
+async def _run_inference(params: BenchParams) -> Measurement:
+    from src.ai_model_client import ModelInterface
+    from src.inference.client_pool import ClientPool
+    from src.inference.stub_server import LatencyConfig, StubConfig, StubServer
+    from src.schema.client_schema import ClientModel
+    from src.schema.tool_bundle import ToolBundle
+
+    tools = ToolBundle.from_data(make_schema(params.properties))
+    conf = ClientModel.model_validate(
+        {
+            "router": {
+                "name": "bench",
+                "base_url": "http://127.0.0.1:1/v1",
+                "role": "Вызывай функции",
+                "api_key": "bench",
+                "models": {
+                    "name": "bench-model",
+                    "semaphore": params.concurrency,
+                    "max_tokens": 256,
+                    "temperature": 0.0,
+                },
+            },
+            "queries": make_queries(params.queries),
+        }
+    )
+    router = conf.routers[0]
+    model = router.models[0]
+    stub_conf = StubConfig(latency=LatencyConfig(distribution="fixed", mean=0.0))
+
+    samples: list[float] = []
+    semaphore = asyncio.Semaphore(params.concurrency)
+    async with (
+        StubServer(stub_conf) as stub,
+        ClientPool(max_connections=params.concurrency) as pool,
+    ):
+        ai = pool.get(router, stub.base_url)
+
+        async def one(query: str) -> None:
+            async with semaphore:
+                t = time.perf_counter()
+                await ModelInterface.call_with_functions(
+                    ai, conf, router, model, query, tools
+                )
+                samples.append(time.perf_counter() - t)
+
+        # Прогрев: соединения и шаблон запроса
+        await asyncio.gather(*(one(q) for q in conf.queries[: params.concurrency]))
+        samples.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(one(q) for q in conf.queries))
+        total = time.perf_counter() - started
+    return Measurement.from_samples(samples, total)
+
+
+def bench_call_with_functions(params: BenchParams) -> Measurement:
+    return asyncio.run(_run_inference(params))
+
+
+BENCHMARKS: dict[str, Callable[[BenchParams], Measurement]] = {
+    "schema_validate": bench_schema_validate,
+    "function_sync": bench_function_sync,
+    "normalize_value": bench_normalize_value,
+    "call_with_functions": bench_call_with_functions,
+}
+
+
+def run_suite(params: BenchParams, only: list[str] | None = None) -> dict[str, Any]:
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        results[name] = asdict(bench(params))
+        print(
+            f"{name:<22} {results[name]['ops_per_s']:>12.1f} ops/s "
+            f"p50 {results[name]['p50_ms']:>9.3f} мс  p95 {results[name]['p95_ms']:>9.3f} мс"
+        )
+    return {
+        "version": BASELINE_VERSION,
+        "created": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": asdict(params),
+        "benchmarks": results,
+    }
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float
+) -> list[str]:
+    """Список регрессий: падение ops/s или рост p95 больше чем на `threshold`.
+
+    Бенчмарк базовой линии, которого нет в текущих результатах (переименован
+    или удалён), тоже регрессия: иначе пропажа замера выглядела бы как успех.
+    """
+    regressions = []
+    for name, base in baseline["benchmarks"].items():
+        now = current["benchmarks"].get(name)
+        if now is None:
+            regressions.append(f"{name}: нет в текущих результатах")
+            continue
+        if now["ops_per_s"] < base["ops_per_s"] * (1 - threshold):
+            regressions.append(
+                f"{name}: пропускная способность {now['ops_per_s']:.1f} ops/s "
+                f"против {base['ops_per_s']:.1f} в базовой линии"
+            )
+        if now["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {now['p95_ms']:.3f} мс против {base['p95_ms']:.3f} мс "
+                "в базовой линии"
+            )
+    return regressions
+
+
+def _read(path: str) -> dict[str, Any]:
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    if data.get("version") != BASELINE_VERSION:
+        raise SystemExit(f"❌ {path}: неподдерживаемая версия базовой линии")
+    return data
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Прогнать бенчмарки")
+    run_parser.add_argument("--out", help="Куда записать результаты (JSON)")
+    for field, default in asdict(BenchParams()).items():
+        run_parser.add_argument(f"--{field}", type=int, default=default)
+    run_parser.add_argument("--only", nargs="*", choices=list(BENCHMARKS))
+
+    compare_parser = sub.add_parser("compare", help="Сравнить с базовой линией")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument(
+        "current", nargs="?", help="Готовые результаты; без него — свежий прогон"
+    )
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        params = BenchParams(**{f: getattr(args, f) for f in asdict(BenchParams())})
+        results = run_suite(params, args.only)
+        if args.out:
+            Path(args.out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        return 0
+
+    baseline = _read(args.baseline)
+    if args.current:
+        current = _read(args.current)
+    else:
+        # Свежий прогон с теми же размерами, что и у базовой линии
+        current = run_suite(
+            BenchParams(**baseline["params"]), list(baseline["benchmarks"])
+        )
+
+    regressions = compare(baseline, current, args.threshold)
+    for line in regressions:
+        print(f"❌ {line}")
+    if not regressions:
+        print(f"✅ Регрессий больше {args.threshold:.0%} нет")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -67,6 +67,12 @@ class DefaultValueMismatch(BaseFunctionException):
     pass
 
 
+class EnumValueMismatch(BaseFunctionException):
+    """Ошибка: модель передала значение аргумента, которого нет в enum схемы."""
+
+    pass
+
+
 class LLMGenerationError(BaseFunctionException):
     """Ошибка самой генерации (лимиты, фильтры)"""
 
@@ -77,3 +83,21 @@ class LLMMismatchError(BaseFunctionException):
     """Ошибка логики (не та функция, просто текст)"""
 
     pass
+
+
+class FunctionLoadError(BaseFunctionException):
+    """Ошибка: не удалось загрузить модуль или найти в нём функцию."""
+
+    pass
+
+
+class CorpusLoadError(BaseFunctionException):
+    """Ошибка: некорректная строка в JSONL-наборе запросов."""
+
+    pass
+
+
+class RunAbortedError(BaseFunctionException):
+    """Прогон остановлен защитой: запрос не отправлялся или был отменён."""
+
+    pass
@@ -0,0 +1,238 @@
+import asyncio
+import tempfile
+from collections.abc import AsyncGenerator, Callable, Iterable
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any
+
+import orjson
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+
+from src.ai_model_client import ModelInterface
+from src.exceptions.custom_exceptions import LLMGenerationError
+from src.inference.corpus import QueryRecord
+from src.inference.metrics import MetricsCollector
+from src.inference.pipeline import Completed
+from src.inference.request_template import RequestTemplate
+from src.inference.trace import RequestTrace
+from src.schema.client_schema import BatchConfig, ClientModel, ModelConfig, RouterConfig
+from src.schema.tool_bundle import ToolBundle
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+@dataclass(slots=True)
+class BatchState:
+    batch_id: str
+    status: str = "validating"
+    output_file_id: str | None = None
+    error_file_id: str | None = None
+
+
+@dataclass(slots=True)
+class BatchCell:
+    """Пакеты одной пары роутер/модель: файлы запросов и созданные batch-задания."""
+
+    router: RouterConfig
+    model: ModelConfig
+    ai: AsyncOpenAI
+    template: RequestTemplate
+    records: dict[str, QueryRecord] = field(default_factory=dict)
+    files: list[Path] = field(default_factory=list)
+    batches: list[BatchState] = field(default_factory=list)
+    _current: IO[bytes] | None = None
+    _lines: int = 0
+
+
+class BatchRunner:
+    """Пакетный прогон: все запросы ячейки уходят одним (или несколькими) batch.
+
+    Запросы сериализуются в JSONL во временный каталог по мере чтения набора,
+    файлы загружаются через `/files`, задания создаются через `/batches` и
+    опрашиваются раз в `poll_interval`. Результаты проходят те же проверки, что
+    и в онлайн-режиме (`ModelInterface.check_response`), и отдаются как
+    `Completed` — отчёт строится тем же циклом, что и для `run_pipeline`.
+    """
+
+    def __init__(
+        self,
+        client_conf: ClientModel,
+        tools: ToolBundle,
+        clients: Callable[[RouterConfig], AsyncOpenAI],
+        metrics: MetricsCollector | None = None,
+    ):
+        self.client_conf = client_conf
+        self.tools = tools
+        self.conf: BatchConfig = client_conf.batch
+        self.metrics = metrics
+        self.cells = [
+            BatchCell(
+                router=router,
+                model=model,
+                # Служебные вызовы /files и /batches повторяет SDK
+                ai=clients(router).with_options(max_retries=router.max_retries),
+                template=RequestTemplate(router, model, tools, stream=False),
+            )
+            for router, model in client_conf.matrix
+        ]
+        self._workdir: Path | None = None
+
+    def _write(self, cell: BatchCell, record: QueryRecord) -> None:
+        if cell._current is None or cell._lines >= self.conf.max_requests:
+            if cell._current is not None:
+                cell._current.close()
+            name = f"{cell.router.config_name}-{cell.model.model_id}-{len(cell.files)}"
+            path = self._workdir / f"{name.replace('/', '_')}.jsonl"
+            cell.files.append(path)
+            cell._current = path.open("wb")
+            cell._lines = 0
+
+        custom_id = str(record.index)
+        cell._current.write(
+            b'{"custom_id":'
+            + orjson.dumps(custom_id)
+            + b',"method":"POST","url":"'
+            + BATCH_ENDPOINT.encode()
+            + b'","body":'
+            + cell.template.render(record.query)
+            + b"}\n"
+        )
+        cell._lines += 1
+        cell.records[custom_id] = record
+
+    async def submit(self, records: Iterable[QueryRecord]) -> None:
+        # Входные JSONL нужны только до загрузки: каталог удаляется и при ошибке
+        with tempfile.TemporaryDirectory(prefix="batch-") as workdir:
+            self._workdir = Path(workdir)
+            try:
+                await self._submit(records)
+            finally:
+                for cell in self.cells:
+                    if cell._current is not None:
+                        cell._current.close()
+                        cell._current = None
+                self._workdir = None
+
+    async def _submit(self, records: Iterable[QueryRecord]) -> None:
+        for record in records:
+            for cell in self.cells:
+                self._write(cell, record)
+
+        for cell in self.cells:
+            if cell._current is not None:
+                cell._current.close()
+                cell._current = None
+            for path in cell.files:
+                with path.open("rb") as f:
+                    uploaded = await cell.ai.files.create(
+                        file=(path.name, f), purpose="batch"
+                    )
+                batch = await cell.ai.batches.create(
+                    input_file_id=uploaded.id,
+                    endpoint=BATCH_ENDPOINT,
+                    completion_window=self.conf.completion_window,
+                )
+                cell.batches.append(BatchState(batch.id, batch.status))
+                path.unlink(missing_ok=True)
+
+    async def wait(self) -> None:
+        """Опрашивает задания до конечного статуса."""
+        pending = [state for cell in self.cells for state in cell.batches]
+        clients = {
+            state.batch_id: cell.ai for cell in self.cells for state in cell.batches
+        }
+        while pending:
+            for state in pending:
+                batch = await clients[state.batch_id].batches.retrieve(state.batch_id)
+                state.status = batch.status
+                state.output_file_id = batch.output_file_id
+                state.error_file_id = batch.error_file_id
+            pending = [s for s in pending if s.status not in TERMINAL_STATUSES]
+            if pending:
+                await asyncio.sleep(self.conf.poll_interval)
+
+    def _complete(
+        self, cell: BatchCell, record: QueryRecord, item: dict[str, Any] | None
+    ) -> Any:
+        """Результат строки пакета через проверки онлайн-режима (или исключение)."""
+        tracking = (
+            self.metrics.track(cell.router.config_name, cell.model.model_id)
+            if self.metrics is not None
+            else nullcontext(RequestTrace())
+        )
+        try:
+            with tracking as trace:
+                if item is None:
+                    raise LLMGenerationError(
+                        message="Нет результата для запроса в пакете",
+                        fields={
+                            "batch_status": ", ".join(
+                                sorted({state.status for state in cell.batches})
+                            )
+                        },
+                    )
+
+                response = item.get("response") or {}
+                status = response.get("status_code")
+                if item.get("error") or status != 200:
+                    body = response.get("body") or {}
+                    error = item.get("error") or body.get("error") or {}
+                    raise LLMGenerationError(
+                        message=f"Ошибка в пакете: {error.get('message', 'unknown')}",
+                        fields={"status_code": status, "custom_id": item["custom_id"]},
+                    )
+
+                result = ModelInterface.check_response(
+                    self.client_conf,
+                    cell.model,
+                    ChatCompletion.model_validate(response["body"]),
+                    self.tools,
+                    trace,
+                    record.expected_functions,
+                )
+                record.check(result["calls"])
+                return result
+        except Exception as e:
+            return e
+
+    async def results(self) -> AsyncGenerator[Completed, None]:
+        for cell in self.cells:
+            file_ids = [
+                file_id
+                for state in cell.batches
+                for file_id in (state.output_file_id, state.error_file_id)
+                if file_id
+            ]
+            for file_id in file_ids:
+                async with cell.ai.files.with_streaming_response.content(
+                    file_id
+                ) as response:
+                    async for line in response.iter_lines():
+                        if not line.strip():
+                            continue
+                        item = orjson.loads(line)
+                        record = cell.records.pop(item.get("custom_id"), None)
+                        if record is not None:
+                            yield Completed(
+                                (cell.router, cell.model, record),
+                                self._complete(cell, record, item),
+                            )
+
+            # Строки без результата: задание истекло, отменено или упало целиком
+            for record in cell.records.values():
+                yield Completed(
+                    (cell.router, cell.model, record),
+                    self._complete(cell, record, None),
+                )
+            cell.records.clear()
+
+    async def run(
+        self, records: Iterable[QueryRecord]
+    ) -> AsyncGenerator[Completed, None]:
+        await self.submit(records)
+        await self.wait()
+        async for done in self.results():
+            yield done
@@ -0,0 +1,48 @@
+from typing import TYPE_CHECKING
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+if TYPE_CHECKING:
+    from src.schema.client_schema import RouterConfig
+
+
+class ClientPool:
+    """Общий пул соединений для всех роутеров прогона.
+
+    `AsyncOpenAI` создаётся один раз на пару (base_url, ключ) и работает поверх
+    одного `httpx.AsyncClient`, поэтому keep-alive соединения к одному хосту
+    переиспользуются всеми моделями роутера. Повторы SDK отключены — ими
+    управляет `RetryPolicy`.
+    """
+
+    def __init__(self, max_connections: int = 100):
+        self._http = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            )
+        )
+        self._clients: dict[tuple[str, str], AsyncOpenAI] = {}
+
+    def get(self, router: "RouterConfig", base_url: str | None = None) -> AsyncOpenAI:
+        base_url = base_url or str(router.base_url)
+        api_key = router.api_key.get_secret_value()
+        key = (base_url, api_key)
+        if key not in self._clients:
+            self._clients[key] = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=router.timeout,
+                max_retries=0,
+                http_client=self._http,
+            )
+        return self._clients[key]
+
+    async def __aenter__(self) -> "ClientPool":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        # Клиенты не владеют соединениями — закрывается только общий транспорт
+        self._clients.clear()
+        await self._http.aclose()
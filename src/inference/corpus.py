@@ -0,0 +1,142 @@
+import gzip
+from collections.abc import Iterator
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any
+
+import orjson
+
+from src.exceptions.custom_exceptions import CorpusLoadError, LLMMismatchError
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+@dataclass(slots=True)
+class QueryRecord:
+    """Запрос набора: текст и (необязательно) ожидаемые вызовы функций.
+
+    `expected_function` — имя или список имён (параллельные вызовы). Для одного
+    имени `expected_arguments` — аргументы вызова, для списка — словарь
+    `{имя функции: аргументы}`. Аргументы сверяются как подмножество.
+    """
+
+    index: int
+    query: str
+    expected_function: str | list[str] | None = None
+    expected_arguments: dict[str, Any] | None = None
+    tags: tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(
+        cls, index: int, data: dict[str, Any], path: Path | None = None
+    ) -> "QueryRecord":
+        if problem := cls._shape_error(data):
+            raise CorpusLoadError(
+                message=f"Некорректная строка в наборе запросов: {problem}",
+                fields={"path": str(path) if path else None, "line": index + 1},
+            )
+        return cls(
+            index=index,
+            query=data["query"],
+            expected_function=data.get("expected_function"),
+            expected_arguments=data.get("expected_arguments"),
+            tags=tuple(data.get("tags") or ()),
+        )
+
+    @staticmethod
+    def _shape_error(data: dict[str, Any]) -> str | None:
+        if not isinstance(data.get("query"), str):
+            return "query должен быть строкой"
+
+        function = data.get("expected_function")
+        arguments = data.get("expected_arguments")
+        if function is not None and not (
+            isinstance(function, str)
+            or (
+                isinstance(function, list) and all(isinstance(f, str) for f in function)
+            )
+        ):
+            return "expected_function должен быть строкой или списком строк"
+        if arguments is not None and not isinstance(arguments, dict):
+            return "expected_arguments должен быть объектом"
+        if arguments and not isinstance(function, str):
+            if not all(isinstance(args, dict) for args in arguments.values()):
+                return (
+                    "для списка expected_function expected_arguments должен "
+                    "иметь вид {имя функции: аргументы}"
+                )
+        tags = data.get("tags")
+        if tags is not None and not (
+            isinstance(tags, list) and all(isinstance(t, str) for t in tags)
+        ):
+            return "tags должен быть списком строк"
+        return None
+
+    @property
+    def expected_functions(self) -> set[str] | None:
+        if not self.expected_function:
+            return None
+        if isinstance(self.expected_function, str):
+            return {self.expected_function}
+        return set(self.expected_function)
+
+    def check(self, calls: list[dict[str, Any]]) -> None:
+        """Сверяет аргументы вызовов модели с ожидаемыми (подмножество ключей)."""
+        if not self.expected_arguments:
+            return
+
+        if isinstance(self.expected_function, str):
+            expected = {self.expected_function: self.expected_arguments}
+        else:
+            expected = self.expected_arguments
+
+        received = {call["name"]: call["arguments"] for call in calls}
+        diff = {
+            f"{name}.{key}": {"expected": value, "received": arguments.get(key)}
+            for name, expected_args in expected.items()
+            for arguments in (received.get(name) or {},)
+            for key, value in expected_args.items()
+            if arguments.get(key) != value
+        }
+        if diff:
+            raise LLMMismatchError(
+                message="Аргументы вызова не совпадают с ожидаемыми",
+                fields={"index": self.index, "diff": diff},
+            )
+
+
+def _open_corpus(path: Path) -> IO[bytes]:
+    with path.open("rb") as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    return gzip.open(path, "rb") if compressed else path.open("rb")
+
+
+def iter_corpus(
+    path: Path, start: int = 0, stop: int | None = None
+) -> Iterator[QueryRecord]:
+    """Построчно читает JSONL (или .jsonl.gz) набор запросов в диапазоне строк.
+
+    `start`/`stop` — номера строк файла (с нуля, `stop` не включается), поэтому
+    набор можно делить на шарды между задачами CI без предварительного разбора.
+    Пустые строки пропускаются, но учитываются в нумерации.
+    """
+    with _open_corpus(path) as f:
+        for index, line in enumerate(islice(f, start, stop), start=start):
+            if not line.strip():
+                continue
+            try:
+                data = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                raise CorpusLoadError(
+                    message=f"Некорректная строка в наборе запросов: {e}",
+                    fields={"path": str(path), "line": index + 1},
+                ) from e
+            if isinstance(data, str):
+                data = {"query": data}
+            if not isinstance(data, dict) or "query" not in data:
+                raise CorpusLoadError(
+                    message="Строка набора запросов должна содержать поле query",
+                    fields={"path": str(path), "line": index + 1},
+                )
+            yield QueryRecord.from_dict(index, data, path)
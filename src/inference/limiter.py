@@ -0,0 +1,211 @@
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal
+
+from src.inference.outcomes import (
+    OK,
+    OVERLOAD_OUTCOMES,
+    RATE_LIMITED,
+    classify_outcome,
+)
+
+if TYPE_CHECKING:
+    from src.schema.client_schema import ModelConfig
+
+LimiterAlgorithm = Literal["aimd", "gradient"]
+
+
+@dataclass(slots=True)
+class LimiterSlot:
+    started: float
+    outcome: str | None = None
+
+
+@dataclass(slots=True)
+class LimitSample:
+    elapsed: float
+    limit: int
+    in_flight: int
+
+
+class StaticLimiter:
+    """Фиксированный лимит параллельных запросов (прежний `asyncio.Semaphore`)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.history: list[LimitSample] = []
+        self._sem = asyncio.Semaphore(limit)
+
+    def on_overload(self) -> None:
+        """Фиксированный лимит перегрузку не учитывает."""
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncGenerator[LimiterSlot, None]:
+        async with self._sem:
+            yield LimiterSlot(started=time.monotonic())
+
+
+class AdaptiveLimiter:
+    """Адаптивный лимит параллельных запросов с потолком `ceiling`.
+
+    * `aimd` — +1/limit за успешный ответ, умножение на `backoff` при 429,
+      таймауте или росте сглаженной задержки выше `latency_tolerance` × базовая;
+    * `gradient` — лимит масштабируется отношением базовой задержки к текущей
+      с запасом √limit на очередь, при перегрузке — умножение на `backoff`.
+
+    Снижение выполняется не чаще одного раза за сглаженную задержку, чтобы
+    волна одновременных 429 не обнуляла лимит.
+    """
+
+    def __init__(
+        self,
+        ceiling: int,
+        algorithm: LimiterAlgorithm = "aimd",
+        initial: int | None = None,
+        min_limit: int = 1,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.2,
+    ):
+        self.ceiling = ceiling
+        self.algorithm = algorithm
+        self.min_limit = min(min_limit, ceiling)
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+
+        start = initial if initial is not None else max(self.min_limit, ceiling // 2)
+        self._limit = float(min(max(start, self.min_limit), ceiling))
+        self.in_flight = 0
+
+        self.history: list[LimitSample] = []
+        self._started = time.monotonic()
+        self._waiters: deque[asyncio.Future] = deque()
+        self._baseline: float | None = None
+        self._smoothed: float | None = None
+        self._last_drop = float("-inf")
+        self._record()
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    def _record(self) -> None:
+        if not self.history or self.history[-1].limit != self.limit:
+            self.history.append(
+                LimitSample(
+                    elapsed=round(time.monotonic() - self._started, 3),
+                    limit=self.limit,
+                    in_flight=self.in_flight,
+                )
+            )
+
+    def _wake(self) -> None:
+        free = self.limit - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def _acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self.in_flight >= self.limit:
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                # Разбуженный, но отменённый ожидающий передаёт место следующему
+                self._wake()
+                raise
+        self.in_flight += 1
+
+    def _release(self, outcome: str, latency: float) -> None:
+        self.in_flight -= 1
+        self._update(outcome, latency)
+        self._record()
+        self._wake()
+
+    def _update(self, outcome: str, latency: float) -> None:
+        now = time.monotonic()
+
+        if outcome == OK:
+            self._smoothed = (
+                latency
+                if self._smoothed is None
+                else self._smoothed + (latency - self._smoothed) * self.smoothing
+            )
+            # Базовая задержка — минимум сглаженной с медленным дрейфом вверх
+            if self._baseline is None or self._smoothed < self._baseline:
+                self._baseline = self._smoothed
+            else:
+                self._baseline += (self._smoothed - self._baseline) * 0.01
+
+        overloaded = outcome in OVERLOAD_OUTCOMES or (
+            outcome == OK
+            and self.algorithm == "aimd"
+            and self._baseline is not None
+            and self._smoothed > self._baseline * self.latency_tolerance
+        )
+
+        if overloaded:
+            if now - self._last_drop >= (self._smoothed or 0.0):
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+                self._last_drop = now
+            return
+
+        if outcome != OK:
+            return
+
+        if self.algorithm == "aimd":
+            self._limit = min(self.ceiling, self._limit + 1 / self._limit)
+            return
+
+        gradient = max(0.5, min(1.0, self._baseline / self._smoothed))
+        target = self._limit * gradient + math.sqrt(self._limit)
+        self._limit = min(
+            self.ceiling,
+            max(self.min_limit, self._limit + (target - self._limit) * self.smoothing),
+        )
+
+    def on_overload(self) -> None:
+        """Перегрузка на попытке, которую поглотил повтор внутри слота."""
+        self._update(RATE_LIMITED, 0.0)
+        self._record()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncGenerator[LimiterSlot, None]:
+        await self._acquire()
+        slot = LimiterSlot(started=time.monotonic())
+        try:
+            yield slot
+        except BaseException as e:
+            if slot.outcome is None:
+                slot.outcome = classify_outcome(e)
+            raise
+        finally:
+            self._release(slot.outcome or OK, time.monotonic() - slot.started)
+
+
+def build_limiter(model_conf: "ModelConfig") -> StaticLimiter | AdaptiveLimiter:
+    adaptive = model_conf.adaptive
+    if adaptive is None:
+        return StaticLimiter(model_conf.semaphore)
+
+    return AdaptiveLimiter(
+        ceiling=model_conf.semaphore,
+        algorithm=adaptive.algorithm,
+        initial=adaptive.initial,
+        min_limit=adaptive.min_limit,
+        backoff=adaptive.backoff,
+        latency_tolerance=adaptive.latency_tolerance,
+        smoothing=adaptive.smoothing,
+    )
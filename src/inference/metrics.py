@@ -0,0 +1,340 @@
+import asyncio
+import json
+import math
+import time
+from collections import Counter
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, Any
+
+import orjson
+
+from src.inference.outcomes import (
+    CANCELLED,
+    INVALID_ARGUMENTS,
+    MISMATCH,
+    OK,
+    classify_outcome,
+)
+from src.inference.trace import RequestTrace
+
+QUANTILES = (0.5, 0.95, 0.99)
+# Исходы, при которых модель ответила — по ним считается точность вызова функции
+ANSWERED_OUTCOMES = frozenset({OK, MISMATCH, INVALID_ARGUMENTS})
+PROMETHEUS_PREFIX = "function_api"
+
+
+@dataclass(slots=True)
+class RequestMetric:
+    router: str
+    model: str
+    outcome: str
+    started: float
+    latency: float
+    queue_wait: float
+    rate_limit_wait: float
+    retries: int
+    hedged: bool
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    replayed: bool
+    aborted: bool
+    time_to_first_token: float | None
+    time_to_tool_name: float | None
+
+    @property
+    def cell(self) -> str:
+        return f"{self.router}/{self.model}"
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Перцентиль с линейной интерполяцией по отсортированному списку."""
+    if not values:
+        return 0.0
+    pos = (len(values) - 1) * q
+    low, high = math.floor(pos), math.ceil(pos)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Распределение в логарифмических корзинах шириной `GAMMA`.
+
+    Квантили — с относительной ошибкой не больше (γ−1)/(γ+1) ≈ 1%, память —
+    по числу занятых корзин, а не по числу значений.
+    """
+
+    GAMMA = 1.02
+    # Значения меньше микросекунды (и нули) считаются одной корзиной
+    MIN_VALUE = 1e-6
+
+    __slots__ = ("buckets", "count", "total", "zeros")
+
+    def __init__(self):
+        self.buckets: Counter[int] = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.zeros = 0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value < self.MIN_VALUE:
+            self.zeros += 1
+        else:
+            self.buckets[math.ceil(math.log(value, self.GAMMA))] += 1
+
+    def quantile(self, q: float) -> float:
+        rank = (self.count - 1) * q
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                # Середина корзины (γ^(k-1), γ^k]
+                return 2 * self.GAMMA**key / (1 + self.GAMMA)
+        return 0.0
+
+    def quantiles(self) -> dict[str, float]:
+        return {f"p{round(q * 100)}": round(self.quantile(q), 4) for q in QUANTILES}
+
+
+@dataclass(slots=True)
+class CellStats:
+    """Накопленная статистика пары роутер/модель; сами записи не хранятся."""
+
+    router: str
+    model: str
+    requests: int = 0
+    outcomes: Counter[str] = field(default_factory=Counter)
+    started: float = math.inf
+    finished: float = -math.inf
+    latency: Histogram = field(default_factory=Histogram)
+    queue_wait: Histogram = field(default_factory=Histogram)
+    rate_limit_wait: Histogram = field(default_factory=Histogram)
+    time_to_first_token: Histogram = field(default_factory=Histogram)
+    retries: int = 0
+    hedged: int = 0
+    replayed: int = 0
+    aborted: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+
+    def add(self, metric: RequestMetric) -> None:
+        self.requests += 1
+        self.outcomes[metric.outcome] += 1
+        self.started = min(self.started, metric.started)
+        self.finished = max(
+            self.finished, metric.started + metric.queue_wait + metric.latency
+        )
+        self.latency.add(metric.latency)
+        self.queue_wait.add(metric.queue_wait)
+        self.rate_limit_wait.add(metric.rate_limit_wait)
+        if metric.time_to_first_token:
+            self.time_to_first_token.add(metric.time_to_first_token)
+        self.retries += metric.retries
+        self.hedged += metric.hedged
+        self.replayed += metric.replayed
+        self.aborted += metric.aborted
+        self.prompt_tokens += metric.prompt_tokens
+        self.completion_tokens += metric.completion_tokens
+        self.total_tokens += metric.total_tokens
+
+    @property
+    def throughput(self) -> float:
+        return round(self.requests / max(self.finished - self.started, 1e-9), 3)
+
+
+class MetricsCollector:
+    """Телеметрия запросов прогона: задержки, ожидание в очереди, повторы, токены.
+
+    Метрика запроса сразу сводится в статистику его ячейки, передаётся
+    подписчикам (`listeners`) и, с `records_path`, дописывается строкой в
+    JSONL — в памяти записи не копятся, сколько бы запросов ни было в наборе.
+    """
+
+    def __init__(self, records_path: Path | None = None):
+        self.cells: dict[str, CellStats] = {}
+        self.listeners: list[Callable[[RequestMetric], None]] = []
+        self._records: IO[bytes] | None = None
+        if records_path is not None:
+            records_path.parent.mkdir(parents=True, exist_ok=True)
+            self._records = records_path.open("wb")
+
+    def close(self) -> None:
+        if self._records is not None:
+            self._records.close()
+            self._records = None
+
+    def add(self, metric: RequestMetric) -> None:
+        stats = self.cells.get(metric.cell)
+        if stats is None:
+            stats = self.cells[metric.cell] = CellStats(metric.router, metric.model)
+        stats.add(metric)
+        for listener in self.listeners:
+            listener(metric)
+        if self._records is not None:
+            self._records.write(orjson.dumps(asdict(metric)) + b"\n")
+
+    @contextmanager
+    def track(self, router: str, model: str) -> Generator[RequestTrace, None, None]:
+        """Создаёт трассу запроса и записывает метрику с классом исхода по выходу."""
+        trace = RequestTrace()
+        outcome = OK
+        try:
+            yield trace
+        except asyncio.CancelledError:
+            outcome = CANCELLED
+            raise
+        except Exception as e:
+            outcome = classify_outcome(e)
+            raise
+        finally:
+            trace.latency = time.perf_counter() - trace.created - trace.queue_wait
+            self.add(
+                RequestMetric(
+                    router=router,
+                    model=model,
+                    outcome=outcome,
+                    started=trace.created,
+                    latency=trace.latency,
+                    queue_wait=trace.queue_wait,
+                    rate_limit_wait=trace.rate_limit_wait,
+                    retries=trace.retries,
+                    hedged=trace.hedged,
+                    prompt_tokens=trace.usage.prompt_tokens,
+                    completion_tokens=trace.usage.completion_tokens,
+                    total_tokens=trace.usage.total_tokens,
+                    replayed=trace.replayed,
+                    aborted=trace.aborted,
+                    time_to_first_token=trace.time_to_first_token,
+                    time_to_tool_name=trace.time_to_tool_name,
+                )
+            )
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """Сводка по каждой паре роутер/модель."""
+        result = {}
+        for cell, stats in self.cells.items():
+            outcomes = stats.outcomes
+            answered = sum(outcomes[o] for o in ANSWERED_OUTCOMES)
+            result[cell] = {
+                "router": stats.router,
+                "model": stats.model,
+                "requests": stats.requests,
+                "outcomes": dict(outcomes),
+                "success_rate": round(outcomes[OK] / stats.requests, 4),
+                "accuracy": round(outcomes[OK] / answered, 4) if answered else None,
+                "throughput_rps": stats.throughput,
+                "latency": stats.latency.quantiles(),
+                "queue_wait": stats.queue_wait.quantiles(),
+                "rate_limit_wait": stats.rate_limit_wait.quantiles(),
+                "time_to_first_token": (
+                    stats.time_to_first_token.quantiles()
+                    if stats.time_to_first_token.count
+                    else {}
+                ),
+                "retries": stats.retries,
+                "hedged": stats.hedged,
+                "replayed": stats.replayed,
+                "aborted": stats.aborted,
+                "tokens": {
+                    "prompt": stats.prompt_tokens,
+                    "completion": stats.completion_tokens,
+                    "total": stats.total_tokens,
+                },
+            }
+        return result
+
+    def summary_table(self) -> str:
+        header = (
+            f"{'router/model':<40} {'req':>6} {'ok%':>6} {'acc%':>6} {'rps':>8} "
+            f"{'p50':>7} {'p95':>7} {'p99':>7} {'queue95':>8} {'retries':>7} "
+            f"{'tokens':>9}"
+        )
+        rows = [header, "-" * len(header)]
+        for cell, stats in self.summary().items():
+            latency = stats["latency"]
+            accuracy = (
+                f"{stats['accuracy'] * 100:>6.1f}"
+                if stats["accuracy"] is not None
+                else f"{'-':>6}"
+            )
+            rows.append(
+                f"{cell:<40} {stats['requests']:>6} "
+                f"{stats['success_rate'] * 100:>6.1f} {accuracy} "
+                f"{stats['throughput_rps']:>8.2f} "
+                f"{latency['p50']:>7.3f} {latency['p95']:>7.3f} {latency['p99']:>7.3f} "
+                f"{stats['queue_wait']['p95']:>8.3f} {stats['retries']:>7} "
+                f"{stats['tokens']['total']:>9}"
+            )
+        return "\n".join(rows)
+
+    def to_json(self) -> str:
+        data: dict[str, Any] = {"generated_at": time.time(), "summary": self.summary()}
+        return json.dumps(data, indent=2, ensure_ascii=False)
+
+    def to_prometheus(self) -> str:
+        """Сводка в текстовом формате Prometheus (exposition format 0.0.4)."""
+        p = PROMETHEUS_PREFIX
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+
+        cells = self.cells
+
+        def labels(stats: CellStats, **extra: str) -> str:
+            pairs = {"router": stats.router, "model": stats.model, **extra}
+            return ",".join(f'{k}="{_label(v)}"' for k, v in pairs.items())
+
+        for metric, attr, help_text in (
+            ("request_latency_seconds", "latency", "Chat completion latency"),
+            ("queue_wait_seconds", "queue_wait", "Wait for a concurrency slot"),
+        ):
+            family(metric, "summary", help_text)
+            for stats in cells.values():
+                hist: Histogram = getattr(stats, attr)
+                for q in QUANTILES:
+                    lines.append(
+                        f"{p}_{metric}{{{labels(stats, quantile=str(q))}}} "
+                        f"{hist.quantile(q):.6f}"
+                    )
+                lines.append(f"{p}_{metric}_sum{{{labels(stats)}}} {hist.total:.6f}")
+                lines.append(f"{p}_{metric}_count{{{labels(stats)}}} {hist.count}")
+
+        family("requests_total", "counter", "Requests by outcome class")
+        for stats in cells.values():
+            for outcome, count in sorted(stats.outcomes.items()):
+                lines.append(
+                    f"{p}_requests_total{{{labels(stats, outcome=outcome)}}} {count}"
+                )
+
+        family("retries_total", "counter", "Retried attempts")
+        for stats in cells.values():
+            lines.append(f"{p}_retries_total{{{labels(stats)}}} {stats.retries}")
+
+        family("hedged_total", "counter", "Requests duplicated by hedging")
+        for stats in cells.values():
+            lines.append(f"{p}_hedged_total{{{labels(stats)}}} {stats.hedged}")
+
+        family("tokens_total", "counter", "Tokens reported by usage")
+        for stats in cells.values():
+            for kind in ("prompt", "completion"):
+                total = getattr(stats, f"{kind}_tokens")
+                lines.append(f"{p}_tokens_total{{{labels(stats, kind=kind)}}} {total}")
+
+        family("throughput_rps", "gauge", "Requests per second over the run")
+        for stats in cells.values():
+            lines.append(f"{p}_throughput_rps{{{labels(stats)}}} {stats.throughput}")
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,47 @@
+from src.exceptions.custom_exceptions import (
+    LLMGenerationError,
+    LLMMismatchError,
+    RunAbortedError,
+)
+
+OK = "ok"
+RATE_LIMITED = "rate_limited"
+TIMEOUT = "timeout"
+SERVER_ERROR = "server_error"
+CONNECTION = "connection"
+MISMATCH = "mismatch"
+INVALID_ARGUMENTS = "invalid_arguments"
+CANCELLED = "cancelled"
+SKIPPED = "skipped"
+ERROR = "error"
+
+# Исходы, по которым клиент должен снижать нагрузку на провайдера
+OVERLOAD_OUTCOMES = frozenset({RATE_LIMITED, TIMEOUT})
+# Сбои на стороне провайдера: повод переключиться на другой роутер
+PROVIDER_OUTCOMES = frozenset({RATE_LIMITED, TIMEOUT, SERVER_ERROR, CONNECTION})
+
+
+def classify_outcome(exc: BaseException | None) -> str:
+    """Класс исхода запроса по исключению из `ModelInterface.call_with_functions`."""
+    if exc is None:
+        return OK
+    if isinstance(exc, RunAbortedError):
+        return SKIPPED
+
+    if isinstance(exc, LLMGenerationError) and isinstance(exc.fields, dict):
+        status = exc.fields.get("status_code")
+        if status == 429:
+            return RATE_LIMITED
+        if isinstance(status, int) and status >= 500:
+            return SERVER_ERROR
+        if "timeout" in exc.fields:
+            return TIMEOUT
+        if exc.fields.get("error_type") == "connection":
+            return CONNECTION
+
+    if isinstance(exc, LLMMismatchError):
+        return MISMATCH
+    if isinstance(exc, BaseExceptionGroup):
+        return INVALID_ARGUMENTS
+
+    return ERROR
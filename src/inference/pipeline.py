@@ -0,0 +1,188 @@
+import asyncio
+import itertools
+from collections import Counter, defaultdict
+from collections.abc import AsyncGenerator, Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any
+
+import orjson
+
+from src.exceptions.custom_exceptions import RunAbortedError
+from src.inference.outcomes import OK, SKIPPED, classify_outcome
+
+
+@dataclass(slots=True)
+class QueryResult:
+    """Компактная запись о запросе, которая остаётся в памяти до конца прогона."""
+
+    router: str
+    model: str
+    index: int
+    outcome: str
+    total_tokens: int = 0
+    error: str | None = None
+
+    @property
+    def passed(self) -> bool:
+        return self.outcome == OK
+
+    @classmethod
+    def build(cls, router: str, model: str, index: int, result: Any) -> "QueryResult":
+        if isinstance(result, BaseException):
+            return cls(
+                router=router,
+                model=model,
+                index=index,
+                outcome=classify_outcome(result),
+                error=f"{type(result).__name__}: {result}",
+            )
+        usage = result.get("usage", {}) if isinstance(result, dict) else {}
+        return cls(
+            router=router,
+            model=model,
+            index=index,
+            outcome=OK,
+            total_tokens=usage.get("total_tokens", 0),
+        )
+
+
+class ResultsSummary:
+    """Исходы запросов по ячейкам для сводной таблицы отчёта.
+
+    Успешные запросы остаются только в счётчиках — в памяти хранятся лишь
+    неудачные записи, так что размер сводки растёт с числом ошибок.
+    """
+
+    def __init__(self):
+        self.outcomes: defaultdict[str, Counter[str]] = defaultdict(Counter)
+        self.tokens: Counter[str] = Counter()
+        self.failed: list[QueryResult] = []
+        self.skipped = 0
+
+    def add(self, record: QueryResult) -> None:
+        cell = f"{record.router}/{record.model}"
+        self.outcomes[cell][record.outcome] += 1
+        self.tokens[cell] += record.total_tokens
+        if record.outcome == SKIPPED:
+            self.skipped += 1
+        elif not record.passed:
+            self.failed.append(record)
+
+    def table(self) -> str:
+        header = (
+            f"{'router/model':<40} {'queries':>8} {'ok':>6} {'failed':>6} "
+            f"{'skipped':>7} {'tokens':>9}  failures"
+        )
+        rows = [header, "-" * len(header)]
+        for cell, counts in sorted(self.outcomes.items()):
+            failures = {o: n for o, n in counts.items() if o not in (OK, SKIPPED)}
+            rows.append(
+                f"{cell:<40} {counts.total():>8} {counts[OK]:>6} "
+                f"{sum(failures.values()):>6} {counts[SKIPPED]:>7} "
+                f"{self.tokens[cell]:>9}  "
+                + ", ".join(f"{o}: {n}" for o, n in sorted(failures.items()))
+            )
+        return "\n".join(rows)
+
+
+@dataclass(slots=True)
+class Completed:
+    job: Any
+    result: Any
+
+
+async def run_pipeline(
+    jobs: Iterable[Any],
+    worker: Callable[[Any], Awaitable[Any]],
+    window: int,
+    stop: Callable[[], str | None] | None = None,
+) -> AsyncGenerator[Completed, None]:
+    """Выполняет `worker` по задачам, держа в полёте не больше `window` корутин.
+
+    Задачи берутся из итератора лениво, результаты (или исключения) отдаются
+    по мере готовности — память не растёт с размером набора запросов.
+
+    `stop` проверяется после каждого результата: если он вернул причину,
+    задачи в полёте отменяются, а они и все невыданные задачи отдаются с
+    `RunAbortedError`.
+    """
+    pending: dict[asyncio.Task, Any] = {}
+    source = iter(jobs)
+    reason: str | None = None
+
+    def refill() -> None:
+        for job in source:
+            pending[asyncio.ensure_future(worker(job))] = job
+            if len(pending) >= window:
+                return
+
+    refill()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                job = pending.pop(task)
+                exc = task.exception()
+                yield Completed(job, exc if exc is not None else task.result())
+            if stop is not None and (reason := stop()):
+                break
+            refill()
+
+        if reason is not None:
+            cancelled = list(pending.values())
+            await _cancel(pending)
+            aborted = RunAbortedError(
+                message=f"Прогон остановлен: {reason}", fields={"reason": reason}
+            )
+            for job in itertools.chain(cancelled, source):
+                yield Completed(job, aborted)
+    finally:
+        await _cancel(pending)
+
+
+async def _cancel(pending: dict[asyncio.Task, Any]) -> None:
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    pending.clear()
+
+
+class ResultsWriter:
+    """Построчная запись результатов в JSONL по мере поступления."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file: IO[bytes] | None = None
+
+    def __enter__(self) -> "ResultsWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("wb")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def write(
+        self,
+        record: QueryResult,
+        calls: list[dict[str, Any]] | None = None,
+        tags: tuple[str, ...] = (),
+    ) -> None:
+        line: dict[str, Any] = {
+            "router": record.router,
+            "model": record.model,
+            "index": record.index,
+            "outcome": record.outcome,
+            "total_tokens": record.total_tokens,
+        }
+        if tags:
+            line["tags"] = tags
+        if calls is not None:
+            line["calls"] = calls
+        if record.error is not None:
+            line["error"] = record.error
+        self._file.write(orjson.dumps(line, default=str) + b"\n")
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+# Грубая оценка для BPE-токенизаторов: ~4 символа JSON на токен
+CHARS_PER_TOKEN = 4
+# Ёмкость ведра — доля минутного лимита, чтобы не выбирать его одним всплеском
+BURST_FRACTION = 1 / 6
+
+
+def estimate_prompt_tokens(body: bytes) -> int:
+    return max(1, len(body) // CHARS_PER_TOKEN)
+
+
+class TokenBucket:
+    """Асинхронное ведро токенов с пополнением `per_minute / 60` в секунду.
+
+    Запросы обслуживаются по очереди (FIFO). Резерв больше ёмкости ведра
+    пропускается при полном ведре и уводит уровень в минус — долг
+    отрабатывается ожиданием следующих запросов.
+    """
+
+    def __init__(self, per_minute: int):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, per_minute * BURST_FRACTION)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float) -> float:
+        """Списывает `amount`, возвращает время ожидания в секундах."""
+        started = time.monotonic()
+        async with self._lock:
+            need = min(amount, self.capacity)
+            self._refill()
+            while self.level < need:
+                await asyncio.sleep((need - self.level) / self.rate)
+                self._refill()
+            self.level -= amount
+        return time.monotonic() - started
+
+    def try_acquire(self, amount: float) -> bool:
+        """Списывает `amount` без ожидания; `False` — места нет или есть очередь."""
+        if self._lock.locked():
+            return False
+        self._refill()
+        if self.level < min(amount, self.capacity):
+            return False
+        self.level -= amount
+        return True
+
+    def refund(self, amount: float) -> None:
+        """Возвращает (или, при отрицательном `amount`, доплачивает) токены."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+@dataclass(slots=True)
+class Reservation:
+    limiter: "RateLimiter"
+    tokens: int
+    waited: float = 0.0
+
+    def reconcile(self, actual_tokens: int) -> None:
+        if self.limiter.tokens is not None:
+            self.limiter.tokens.refund(self.tokens - actual_tokens)
+
+    def release(self) -> None:
+        """Возвращает резерв целиком: запрос так и не был отправлен."""
+        if self.limiter.requests is not None:
+            self.limiter.requests.refund(1)
+        self.reconcile(0)
+
+
+class RateLimiter:
+    """Клиентские лимиты RPM/TPM одного роутера или модели."""
+
+    def __init__(self, rpm: int | None = None, tpm: int | None = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+    def try_reserve(self, tokens: int) -> Reservation | None:
+        """Резерв без ожидания (для дублей запроса) или `None`, если места нет."""
+        if self.requests is not None and not self.requests.try_acquire(1):
+            return None
+        if self.tokens is not None and not self.tokens.try_acquire(tokens):
+            if self.requests is not None:
+                self.requests.refund(1)
+            return None
+        return Reservation(limiter=self, tokens=tokens)
+
+    async def reserve(self, tokens: int) -> Reservation:
+        reservation = Reservation(limiter=self, tokens=tokens)
+        if self.requests is not None:
+            reservation.waited += await self.requests.acquire(1)
+        if self.tokens is not None:
+            reservation.waited += await self.tokens.acquire(tokens)
+        return reservation
@@ -0,0 +1,82 @@
+import os
+import time
+from pathlib import Path
+from typing import Literal
+
+from openai.types.chat import ChatCompletion
+
+ReplayMode = Literal["off", "record", "replay", "record_missing"]
+
+
+class ReplayCache:
+    """Запись и воспроизведение ответов `chat.completions.create` с диска.
+
+    * `record` — всегда ходит в API и перезаписывает ответ;
+    * `replay` — только из кэша, промах считается ошибкой (офлайн-прогон);
+    * `record_missing` — из кэша, а при промахе — в API с сохранением.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        mode: ReplayMode,
+        ttl: float | None = None,
+        max_entries: int = 10000,
+    ):
+        self.path = path
+        self.mode = mode
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def reads(self) -> bool:
+        return self.mode in ("replay", "record_missing")
+
+    @property
+    def writes(self) -> bool:
+        return self.mode in ("record", "record_missing")
+
+    def _entry(self, key: str) -> Path:
+        return self.path / f"{key}.json"
+
+    def _expired(self, mtime: float, now: float) -> bool:
+        return self.ttl is not None and mtime + self.ttl < now
+
+    def load(self, key: str) -> ChatCompletion | None:
+        entry = self._entry(key)
+        try:
+            if self._expired(entry.stat().st_mtime, time.time()):
+                entry.unlink(missing_ok=True)
+                return None
+            return ChatCompletion.model_validate_json(entry.read_bytes())
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key: str, response: ChatCompletion) -> None:
+        entry = self._entry(key)
+        tmp = entry.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(response.model_dump_json().encode())
+        tmp.replace(entry)
+
+    def evict(self) -> int:
+        """Удаляет просроченные записи и самые старые сверх `max_entries`."""
+        now = time.time()
+        entries = []
+        removed = 0
+        for entry in self.path.glob("*.json"):
+            mtime = entry.stat().st_mtime
+            if self._expired(mtime, now):
+                entry.unlink(missing_ok=True)
+                removed += 1
+            else:
+                entries.append((mtime, entry))
+
+        overflow = len(entries) - self.max_entries
+        if overflow > 0:
+            entries.sort()
+            for _, entry in entries[:overflow]:
+                entry.unlink(missing_ok=True)
+            removed += overflow
+
+        return removed
@@ -0,0 +1,63 @@
+import hashlib
+from typing import TYPE_CHECKING, Any
+
+import orjson
+
+if TYPE_CHECKING:
+    from src.schema.client_schema import ModelConfig, RouterConfig
+    from src.schema.tool_bundle import ToolBundle
+
+
+class RequestTemplate:
+    """Заранее сериализованное тело chat.completions для набора tools и модели.
+
+    Неизменная часть (модель, параметры, tools, системное сообщение) собирается
+    и сериализуется один раз; на каждый запрос в готовые байты вставляется
+    только сообщение пользователя. `messages` идёт последним ключом, tools
+    отсортированы по имени — префикс запроса одинаков от вызова к вызову,
+    что позволяет провайдеру переиспользовать кэш промпта.
+    """
+
+    __slots__ = ("model", "stream", "digest", "_prefix")
+
+    _SUFFIX = b"]}"
+
+    def __init__(
+        self,
+        router_conf: "RouterConfig",
+        model_conf: "ModelConfig",
+        tools: "ToolBundle",
+        stream: bool | None = None,
+    ):
+        stream = model_conf.stream if stream is None else stream
+        invariant: dict[str, Any] = {
+            "model": model_conf.model_id,
+            "tools": sorted(
+                tools.tool_params(), key=lambda tool: tool["function"]["name"]
+            ),
+            "tool_choice": router_conf.tool_choice,
+            **model_conf.get_params(),
+        }
+        if stream:
+            invariant["stream"] = True
+            invariant["stream_options"] = {"include_usage": True}
+        invariant["messages"] = [router_conf.system_message]
+
+        payload = orjson.dumps(invariant)
+        self.model = model_conf.model_id
+        self.stream = stream
+        # Роутер в ключе: одна модель у разных провайдеров — разные ответы
+        self.digest = hashlib.sha256(
+            router_conf.config_name.encode()
+            + b"\0"
+            + orjson.dumps(invariant, option=orjson.OPT_SORT_KEYS)
+        ).digest()
+        self._prefix = payload[: -len(self._SUFFIX)] + b","
+
+    def render(self, query: str) -> bytes:
+        user = orjson.dumps({"role": "user", "content": query})
+        return self._prefix + user + self._SUFFIX
+
+    def cache_key(self, query: str) -> str:
+        """Ключ кэша записи/воспроизведения: шаблон + текст запроса."""
+        return hashlib.sha256(self.digest + query.encode()).hexdigest()
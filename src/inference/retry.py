@@ -0,0 +1,241 @@
+import asyncio
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, TypeVar
+
+import openai
+
+from src.inference.metrics import percentile
+from src.inference.trace import RequestTrace
+
+if TYPE_CHECKING:
+    from src.schema.client_schema import HedgeConfig
+
+T = TypeVar("T")
+
+# Попытка: след этой попытки и признак дубля (хеджа)
+Send = Callable[[RequestTrace, bool], Awaitable[T]]
+
+RETRYABLE_STATUS = frozenset({408, 409, 429})
+# Потолок для Retry-After, чтобы сервер не усыпил прогон на часы
+MAX_RETRY_AFTER = 120.0
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in RETRYABLE_STATUS or exc.status_code >= 500
+    return False
+
+
+def is_overload(exc: BaseException) -> bool:
+    """429 или таймаут — сигнал адаптивному лимиту параллельности."""
+    if isinstance(exc, openai.APITimeoutError):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code == 429
+
+
+class HedgeSkipped(Exception):
+    """Дубль не отправлен: в клиентских лимитах RPM/TPM нет места без ожидания."""
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Пауза из заголовков `retry-after-ms` / `retry-after` (секунды или дата)."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+
+    try:
+        if (value := headers.get("retry-after-ms")) is not None:
+            return min(MAX_RETRY_AFTER, float(value) / 1000)
+        if (value := headers.get("retry-after")) is not None:
+            try:
+                seconds = float(value)
+            except ValueError:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            return min(MAX_RETRY_AFTER, max(0.0, seconds))
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+class RetryBudget:
+    """Бюджет повторов на прогон: не больше `min_retries + ratio × запросов`.
+
+    Не даёт повторам умножить нагрузку на провайдера, который и так
+    отвечает 429/5xx на большую часть запросов.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.spent = 0
+
+    def record_request(self) -> None:
+        self.requests += 1
+
+    def try_spend(self) -> bool:
+        if self.spent >= self.min_retries + self.ratio * self.requests:
+            return False
+        self.spent += 1
+        return True
+
+    def refund(self) -> None:
+        self.spent = max(0, self.spent - 1)
+
+
+class LatencyWindow:
+    """Скользящее окно задержек успешных запросов для порога хеджирования."""
+
+    def __init__(self, size: int = 500):
+        self._values: deque[float] = deque(maxlen=size)
+
+    def add(self, latency: float) -> None:
+        self._values.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def quantile(self, q: float) -> float:
+        return percentile(sorted(self._values), q)
+
+
+class RetryPolicy:
+    """Повторы с экспоненциальной задержкой и необязательное хеджирование.
+
+    Задержка перед попыткой `n` — случайная в [d/2, d], где
+    `d = min(max_delay, base_delay × 2ⁿ)`; если сервер прислал Retry-After,
+    ждём не меньше него. Повторяются таймауты, ошибки сети, 408/409/429 и 5xx.
+
+    С `hedge` запрос, не ответивший за квантиль задержки ячейки, дублируется,
+    берётся первый успешный ответ, второй отменяется. Дубль расходует тот же
+    бюджет повторов.
+
+    Каждая попытка получает свой `RequestTrace` (`send(trace, hedge)`), в
+    итоговый переносятся сведения принятой. О каждой поглощённой 429 или
+    таймауте сообщается `on_overload` — иначе адаптивный лимит их не видит.
+    """
+
+    def __init__(
+        self,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+        budget: RetryBudget,
+        window: LatencyWindow,
+        hedge: "HedgeConfig | None" = None,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.window = window
+        self.hedge = hedge
+
+    def delay(self, attempt: int, exc: BaseException) -> float:
+        backoff = min(self.max_delay, self.base_delay * 2**attempt)
+        jittered = random.uniform(backoff / 2, backoff)
+        server_delay = retry_after(exc)
+        return max(jittered, server_delay) if server_delay is not None else jittered
+
+    def hedge_after(self) -> float | None:
+        if self.hedge is None or len(self.window) < self.hedge.min_samples:
+            return None
+        return self.window.quantile(self.hedge.quantile)
+
+    async def run(
+        self,
+        send: Send[T],
+        trace: RequestTrace,
+        on_overload: Callable[[], None] | None = None,
+    ) -> T:
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                result = await self._attempt(send, trace, on_overload)
+            except Exception as e:
+                if (
+                    not is_retryable(e)
+                    or attempt >= self.max_retries
+                    or not self.budget.try_spend()
+                ):
+                    raise
+                if on_overload is not None and is_overload(e):
+                    on_overload()
+                await asyncio.sleep(self.delay(attempt, e))
+                attempt += 1
+                trace.retries = attempt
+                continue
+
+            self.window.add(time.perf_counter() - started)
+            return result
+
+    async def _attempt(
+        self,
+        send: Send[T],
+        trace: RequestTrace,
+        on_overload: Callable[[], None] | None,
+    ) -> T:
+        primary_trace = trace.for_attempt()
+        traces = [primary_trace]
+        # Попытка, чей ответ или ошибка стали итогом: её тайминги нужны и при
+        # ошибке (поток, прерванный на неверной функции)
+        settled: RequestTrace | None = primary_trace
+        try:
+            threshold = self.hedge_after()
+            if threshold is None:
+                return await send(primary_trace, False)
+
+            primary = asyncio.ensure_future(send(primary_trace, False))
+            done, _ = await asyncio.wait({primary}, timeout=threshold)
+            if done or not self.budget.try_spend():
+                return await primary
+
+            trace.hedged = True
+            hedge_trace = trace.for_attempt()
+            traces.append(hedge_trace)
+            tasks = {
+                primary: primary_trace,
+                asyncio.ensure_future(send(hedge_trace, True)): hedge_trace,
+            }
+            settled = None
+            errors: list[tuple[BaseException, RequestTrace]] = []
+            try:
+                while tasks:
+                    done, _ = await asyncio.wait(
+                        tasks, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        attempt_trace = tasks.pop(task)
+                        exc = task.exception()
+                        if exc is None:
+                            settled = attempt_trace
+                            return task.result()
+                        if isinstance(exc, HedgeSkipped):
+                            trace.hedged = False
+                            self.budget.refund()
+                            continue
+                        if not is_retryable(exc):
+                            settled = attempt_trace
+                            raise exc
+                        # Ошибку, которую перекроет вторая попытка, лимит видит здесь
+                        if tasks and on_overload is not None and is_overload(exc):
+                            on_overload()
+                        errors.append((exc, attempt_trace))
+                exc, settled = errors[0]
+                raise exc
+            finally:
+                for task in tasks:
+                    task.cancel()
+        finally:
+            if settled is not None:
+                trace.adopt(settled)
+            trace.rate_limit_wait += sum(t.rate_limit_wait for t in traces)
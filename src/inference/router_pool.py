@@ -0,0 +1,211 @@
+import asyncio
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Literal
+
+from src.exceptions.custom_exceptions import LLMGenerationError
+from src.inference.outcomes import PROVIDER_OUTCOMES, classify_outcome
+
+if TYPE_CHECKING:
+    from src.schema.client_schema import FailoverConfig, ModelConfig, RouterConfig
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+
+@dataclass(slots=True)
+class Route:
+    """Куда в итоге ушёл запрос: заполняется пулом по мере переключений."""
+
+    router: "RouterConfig | None" = None
+    model: "ModelConfig | None" = None
+    failovers: int = 0
+
+
+@dataclass(slots=True)
+class Endpoint:
+    """Ячейка роутер/модель со скользящей статистикой и автоматом отключения."""
+
+    router: "RouterConfig"
+    model: "ModelConfig"
+    outcomes: deque[bool]
+    latency: float | None = None
+    state: BreakerState = "closed"
+    opened_at: float = 0.0
+    probing: bool = False
+    trips: int = 0
+    requests: int = 0
+    tripped: asyncio.Event = field(default_factory=asyncio.Event)
+
+    @property
+    def name(self) -> str:
+        return f"{self.router.config_name}/{self.model.model_id}"
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+
+class RouterPool:
+    """Балансировка запросов между роутерами с учётом их здоровья.
+
+    Ячейка выбирается случайно с вероятностью, пропорциональной
+    `weight × (1 − доля ошибок) / сглаженная задержка`. Ошибками считаются
+    только сбои провайдера (429, 5xx, таймауты, сеть) — неверный вызов функции
+    говорит о модели, а не о доступности роутера.
+
+    Когда доля ошибок в окне достигает `error_threshold`, ячейка отключается
+    на `cooldown` секунд, а запросы, которые уже ждут её ответа, отменяются и
+    уходят в другую ячейку. По истечении паузы пропускается один пробный
+    запрос: успех возвращает ячейку в работу, сбой — отключает снова.
+    """
+
+    def __init__(
+        self,
+        endpoints: list[tuple["RouterConfig", "ModelConfig"]],
+        conf: "FailoverConfig",
+    ):
+        self.conf = conf
+        self.endpoints = [
+            Endpoint(router, model, deque(maxlen=conf.window))
+            for router, model in endpoints
+        ]
+
+    def _score(self, endpoint: Endpoint, default_latency: float) -> float:
+        latency = endpoint.latency if endpoint.latency is not None else default_latency
+        # Ячейка без единого успеха в окне всё же получает редкие запросы
+        health = max(1 - endpoint.error_rate, 0.05)
+        return endpoint.router.weight * health / max(latency, 1e-3)
+
+    def _available(self, endpoint: Endpoint, now: float) -> bool:
+        if endpoint.state == "open" and now - endpoint.opened_at >= self.conf.cooldown:
+            self._half_open(endpoint)
+        if endpoint.state == "half_open":
+            return not endpoint.probing
+        return endpoint.state == "closed"
+
+    def _half_open(self, endpoint: Endpoint) -> None:
+        endpoint.state = "half_open"
+        endpoint.probing = False
+        endpoint.tripped = asyncio.Event()
+
+    def pick(self, exclude: set[str]) -> Endpoint | None:
+        now = time.monotonic()
+        candidates = [
+            e
+            for e in self.endpoints
+            if e.name not in exclude and self._available(e, now)
+        ]
+        if not candidates:
+            # Все отключены: пробуем ту, что отключилась раньше остальных
+            remaining = [e for e in self.endpoints if e.name not in exclude]
+            if not remaining:
+                return None
+            endpoint = min(remaining, key=lambda e: e.opened_at)
+            self._half_open(endpoint)
+            candidates = [endpoint]
+
+        known = [e.latency for e in candidates if e.latency is not None]
+        default_latency = sum(known) / len(known) if known else 1.0
+        endpoint = random.choices(
+            candidates, weights=[self._score(e, default_latency) for e in candidates]
+        )[0]
+        if endpoint.state == "half_open":
+            endpoint.probing = True
+        endpoint.requests += 1
+        return endpoint
+
+    def record(self, endpoint: Endpoint, ok: bool, latency: float) -> None:
+        endpoint.outcomes.append(ok)
+        if ok:
+            a = self.conf.smoothing
+            endpoint.latency = (
+                latency
+                if endpoint.latency is None
+                else (1 - a) * endpoint.latency + a * latency
+            )
+
+        if endpoint.state == "half_open":
+            endpoint.probing = False
+            if ok:
+                endpoint.state = "closed"
+                endpoint.outcomes.clear()
+            else:
+                self._open(endpoint)
+        elif (
+            endpoint.state == "closed"
+            and len(endpoint.outcomes) >= self.conf.min_requests
+            and endpoint.error_rate >= self.conf.error_threshold
+        ):
+            self._open(endpoint)
+
+    def _open(self, endpoint: Endpoint) -> None:
+        endpoint.state = "open"
+        endpoint.opened_at = time.monotonic()
+        endpoint.trips += 1
+        endpoint.tripped.set()
+
+    async def run(
+        self,
+        call: Callable[["RouterConfig", "ModelConfig"], Awaitable[Any]],
+        route: Route,
+    ) -> Any:
+        """Выполняет запрос в лучшей доступной ячейке, переключаясь при сбоях."""
+        tried: set[str] = set()
+        last_error: BaseException | None = None
+        while (endpoint := self.pick(tried)) is not None:
+            if tried:
+                route.failovers += 1
+            tried.add(endpoint.name)
+            route.router, route.model = endpoint.router, endpoint.model
+
+            started = time.monotonic()
+            attempt = asyncio.ensure_future(call(endpoint.router, endpoint.model))
+            tripped = asyncio.ensure_future(endpoint.tripped.wait())
+            try:
+                await asyncio.wait(
+                    {attempt, tripped}, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                tripped.cancel()
+                if not attempt.done():
+                    attempt.cancel()
+                    await asyncio.gather(attempt, return_exceptions=True)
+
+            if attempt.cancelled():
+                # Ячейку отключили, пока запрос был в полёте
+                endpoint.probing = False
+                continue
+
+            exc = attempt.exception()
+            failed = exc is not None and classify_outcome(exc) in PROVIDER_OUTCOMES
+            self.record(endpoint, not failed, time.monotonic() - started)
+            if not failed:
+                return attempt.result()
+            last_error = exc
+
+        if last_error is not None:
+            raise last_error
+        raise LLMGenerationError(
+            message="Нет доступных роутеров: все ячейки отключены",
+            fields={"tried": sorted(tried)},
+        )
+
+    def report(self) -> str:
+        """Состояние ячеек к концу прогона для отчёта."""
+        header = (
+            f"{'endpoint':<40} {'weight':>6} {'state':>9} {'requests':>8} "
+            f"{'err%':>6} {'latency':>8} {'trips':>5}"
+        )
+        lines = [header, "-" * len(header)]
+        for e in self.endpoints:
+            latency = f"{e.latency:.3f}" if e.latency is not None else "-"
+            lines.append(
+                f"{e.name:<40} {e.router.weight:>6g} {e.state:>9} {e.requests:>8} "
+                f"{e.error_rate * 100:>6.1f} {latency:>8} {e.trips:>5}"
+            )
+        return "\n".join(lines)
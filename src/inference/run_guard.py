@@ -0,0 +1,62 @@
+from collections import deque
+from typing import TYPE_CHECKING
+
+from src.inference.metrics import ANSWERED_OUTCOMES, MetricsCollector, RequestMetric
+from src.inference.outcomes import CANCELLED
+
+if TYPE_CHECKING:
+    from src.schema.client_schema import GuardConfig
+
+
+class RunGuard:
+    """Ограничители прогона: токены, оценка стоимости и доля ошибок.
+
+    Подписан на телеметрию и учитывает каждый завершённый запрос. Доля
+    ошибок считается по последним `window` запросам, на которые модель не
+    ответила вовсе (авторизация, 5xx, таймауты); неверный вызов функции
+    ошибкой прогона не считается. Ответы из кэша записи не тратят бюджет.
+    """
+
+    def __init__(self, conf: "GuardConfig", metrics: MetricsCollector):
+        self.conf = conf
+        self.metrics = metrics
+        self.tokens = 0
+        self.cost = 0.0
+        self.reason: str | None = None
+        self._failures: deque[bool] = deque(maxlen=conf.window)
+        metrics.listeners.append(self.observe)
+
+    def observe(self, metric: RequestMetric) -> None:
+        if not metric.replayed:
+            self.tokens += metric.total_tokens
+            price = self.conf.price_for(metric.router, metric.model)
+            if price is not None:
+                self.cost += price.cost(metric.prompt_tokens, metric.completion_tokens)
+        if metric.outcome != CANCELLED:
+            self._failures.append(metric.outcome not in ANSWERED_OUTCOMES)
+
+    def check(self) -> str | None:
+        """Причина остановки прогона или `None`, если лимиты не превышены."""
+        if self.reason is not None:
+            return self.reason
+
+        conf = self.conf
+        if conf.max_tokens is not None and self.tokens >= conf.max_tokens:
+            self.reason = (
+                f"израсходовано {self.tokens} токенов (лимит {conf.max_tokens})"
+            )
+        elif conf.max_cost is not None and self.cost >= conf.max_cost:
+            self.reason = (
+                f"оценка стоимости ${self.cost:.4f} (лимит ${conf.max_cost:g})"
+            )
+        elif (
+            conf.max_error_rate is not None
+            and len(self._failures) >= conf.min_requests
+            and sum(self._failures) / len(self._failures) >= conf.max_error_rate
+        ):
+            rate = sum(self._failures) / len(self._failures)
+            self.reason = (
+                f"доля ошибок {rate:.0%} за последние {len(self._failures)} "
+                f"запросов (лимит {conf.max_error_rate:.0%})"
+            )
+        return self.reason
@@ -0,0 +1,604 @@
+"""Локальный OpenAI-совместимый сервер chat.completions для офлайн-прогонов.
+
+Отвечает вызовом функций из `tools`, упомянутых в запросе (или первой), с
+аргументами, собранными из схемы, и по настройкам добавляет задержки и сбои
+(429/5xx, таймауты, `finish_reason="length"`/`content_filter`, текст вместо
+вызова функции).
+
+Поддерживает и пакетный режим (`/files`, `/batches`): строки пакета
+обрабатываются с теми же сбоями, таймаут строки — отсутствие её результата.
+
+Запуск: `python -m src.inference.stub_server --port 8011 --config stub.yaml`,
+после чего в конфиге роутера указывается `base_url: "http://127.0.0.1:8011/v1"`.
+"""
+
+import argparse
+import asyncio
+import email.parser
+import email.policy
+import hashlib
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Literal
+
+import orjson
+import yaml
+from pydantic import BaseModel, Field, PrivateAttr
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+# Размер фрагмента текста/аргументов в одном SSE-событии
+STREAM_PIECE = 16
+
+PLACEHOLDERS: dict[str, Any] = {
+    "string": "stub",
+    "integer": 1,
+    "number": 1.0,
+    "boolean": True,
+    "array": [],
+    "object": {},
+}
+
+
+class LatencyConfig(BaseModel):
+    distribution: Literal["fixed", "uniform", "normal", "lognormal", "exponential"] = (
+        "fixed"
+    )
+    mean: float = Field(default=0.05, ge=0)
+    stddev: float = Field(default=0.0, ge=0)
+    low: float = Field(default=0.0, ge=0)
+    high: float = Field(default=0.1, ge=0)
+
+    def sample(self, rng: random.Random) -> float:
+        match self.distribution:
+            case "uniform":
+                return rng.uniform(self.low, self.high)
+            case "normal":
+                return max(0.0, rng.gauss(self.mean, self.stddev))
+            case "lognormal":
+                # mean/stddev задаются для самой задержки, а не для её логарифма
+                if self.mean == 0:
+                    return 0.0
+                sigma2 = math.log1p((self.stddev / self.mean) ** 2)
+                mu = math.log(self.mean) - sigma2 / 2
+                return rng.lognormvariate(mu, math.sqrt(sigma2))
+            case "exponential":
+                return rng.expovariate(1 / self.mean) if self.mean else 0.0
+            case _:
+                return self.mean
+
+
+class StubConfig(BaseModel):
+    seed: int = 0
+    latency: LatencyConfig = Field(default_factory=LatencyConfig)
+
+    rate_429: float = Field(default=0.0, ge=0, le=1)
+    rate_5xx: float = Field(default=0.0, ge=0, le=1)
+    rate_timeout: float = Field(default=0.0, ge=0, le=1)
+    rate_length: float = Field(default=0.0, ge=0, le=1)
+    rate_content_filter: float = Field(default=0.0, ge=0, le=1)
+    rate_text: float = Field(default=0.0, ge=0, le=1)
+
+    retry_after: float | None = Field(default=1.0, ge=0)
+    timeout_delay: float = Field(default=300.0, ge=0)
+    stream_chunk_delay: float = Field(default=0.0, ge=0)
+    batch_delay: float = Field(default=0.0, ge=0)
+
+    # Переопределения по имени модели: один сервер изображает разных провайдеров
+    models: dict[str, dict[str, Any]] = Field(default_factory=dict)
+
+    _resolved: dict[str, "StubConfig"] = PrivateAttr(default_factory=dict)
+
+    def for_model(self, model: str | None) -> "StubConfig":
+        if not model or model not in self.models:
+            return self
+        if model not in self._resolved:
+            self._resolved[model] = StubConfig.model_validate(
+                {**self.model_dump(exclude={"models"}), **self.models[model]}
+            )
+        return self._resolved[model]
+
+    @property
+    def faults(self) -> list[tuple[str, float]]:
+        return [
+            ("rate_limit", self.rate_429),
+            ("server_error", self.rate_5xx),
+            ("timeout", self.rate_timeout),
+            ("length", self.rate_length),
+            ("content_filter", self.rate_content_filter),
+            ("text", self.rate_text),
+        ]
+
+    def pick_outcome(self, rng: random.Random) -> str:
+        roll = rng.random()
+        threshold = 0.0
+        for outcome, rate in self.faults:
+            threshold += rate
+            if roll < threshold:
+                return outcome
+        return "ok"
+
+
+def synthesize_arguments(parameters: dict[str, Any]) -> dict[str, Any]:
+    """Аргументы по схеме: default, затем первый элемент enum, затем заглушка по типу."""
+    properties = parameters.get("properties") or {}
+    required = set(parameters.get("required") or [])
+    arguments = {}
+
+    for key, prop in properties.items():
+        if prop.get("default") is not None:
+            arguments[key] = prop["default"]
+        elif prop.get("enum"):
+            arguments[key] = prop["enum"][0]
+        elif key in required:
+            arguments[key] = PLACEHOLDERS.get(prop.get("type", "string"), "stub")
+
+    return arguments
+
+
+def pick_tools(body: dict[str, Any]) -> list[dict[str, Any]]:
+    tools = [t["function"] for t in body.get("tools") or [] if t.get("function")]
+    if not tools:
+        return []
+
+    tool_choice = body.get("tool_choice")
+    if isinstance(tool_choice, dict):
+        name = tool_choice.get("function", {}).get("name")
+        return [next((t for t in tools if t["name"] == name), tools[0])]
+
+    # Функции, чьи имена упомянуты в запросе (параллельные вызовы), иначе первая
+    user_text = " ".join(
+        str(m.get("content", ""))
+        for m in body.get("messages", [])
+        if m.get("role") == "user"
+    )
+    return [t for t in tools if t["name"] in user_text] or tools[:1]
+
+
+def estimate_tokens(payload: bytes | str) -> int:
+    return max(1, len(payload) // 4)
+
+
+class StubServer:
+    """HTTP/1.1 сервер на asyncio; используется как `async with StubServer(conf) as s`."""
+
+    def __init__(
+        self, config: StubConfig | None = None, host: str = "127.0.0.1", port: int = 0
+    ):
+        self.config = config or StubConfig()
+        self.host = host
+        self.port = port
+        self.stats: Counter[str] = Counter()
+        self._seen: Counter[str] = Counter()
+        self._server: asyncio.Server | None = None
+        self._connections: set[asyncio.Task] = set()
+        self._files: dict[str, dict[str, Any]] = {}
+        self._file_data: dict[str, bytes] = {}
+        self._batches: dict[str, dict[str, Any]] = {}
+        self._batch_tasks: set[asyncio.Task] = set()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self) -> "StubServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Соединения, «зависшие» в имитации таймаута, закрываем принудительно
+            for task in (*self._connections, *self._batch_tasks):
+                task.cancel()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "StubServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    def _rng(self, body: bytes) -> random.Random:
+        digest = hashlib.sha256(body).hexdigest()
+        self._seen[digest] += 1
+        return random.Random(f"{self.config.seed}:{digest}:{self._seen[digest]}")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        if task is not None:
+            self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, extra_headers, payload = await self.dispatch(
+                    method, path, body, headers
+                )
+                if isinstance(payload, list):
+                    await self._write_stream(writer, extra_headers, payload)
+                else:
+                    self._write(writer, status, extra_headers, payload)
+                await writer.drain()
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    def _write(self, writer, status: int, headers: dict[str, str], payload: bytes):
+        lines = [
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'Error')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(payload)}",
+            *(f"{k}: {v}" for k, v in headers.items()),
+        ]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+
+    async def _write_stream(self, writer, headers: dict[str, str], events: list[bytes]):
+        """SSE-ответ с chunked-кодированием и паузой `stream_chunk_delay` между событиями."""
+        lines = [
+            "HTTP/1.1 200 OK",
+            "Content-Type: text/event-stream",
+            "Transfer-Encoding: chunked",
+            *(f"{k}: {v}" for k, v in headers.items()),
+        ]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        for event in events:
+            writer.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+            await writer.drain()
+            if self.config.stream_chunk_delay:
+                await asyncio.sleep(self.config.stream_chunk_delay)
+        writer.write(b"0\r\n\r\n")
+
+    async def dispatch(
+        self,
+        method: str,
+        path: str,
+        body: bytes,
+        headers: dict[str, str] | None = None,
+    ) -> tuple[int, dict[str, str], bytes | list[bytes]]:
+        route = path.split("?", 1)[0].rstrip("/")
+        parts = route.split("/")
+
+        if method == "POST" and route.endswith("/chat/completions"):
+            return await self.chat_completion(body)
+        if method == "GET" and route.endswith("/models"):
+            return 200, {}, orjson.dumps({"object": "list", "data": []})
+
+        if method == "POST" and route.endswith("/files"):
+            return self.upload_file(body, (headers or {}).get("content-type", ""))
+        if method == "GET" and "files" in parts and route.endswith("/content"):
+            file_id = parts[-2]
+            if file_id in self._file_data:
+                return 200, {}, self._file_data[file_id]
+        if method == "POST" and route.endswith("/batches"):
+            return self.create_batch(body)
+        if method == "GET" and parts[-2:-1] == ["batches"]:
+            if parts[-1] in self._batches:
+                return 200, {}, orjson.dumps(self._batches[parts[-1]])
+
+        return 404, {}, self._error(f"Unknown route {method} {route}", "not_found")
+
+    @staticmethod
+    def _error(message: str, error_type: str) -> bytes:
+        return orjson.dumps({"error": {"message": message, "type": error_type}})
+
+    async def chat_completion(
+        self, body: bytes
+    ) -> tuple[int, dict[str, str], bytes | list[bytes]]:
+        try:
+            request = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return 400, {}, self._error("Invalid JSON body", "invalid_request_error")
+
+        conf = self.config.for_model(request.get("model"))
+        rng = self._rng(body)
+        outcome = conf.pick_outcome(rng)
+        self.stats[outcome] += 1
+
+        await asyncio.sleep(conf.latency.sample(rng))
+
+        if outcome == "timeout":
+            await asyncio.sleep(conf.timeout_delay)
+        if outcome == "rate_limit":
+            headers = {}
+            if conf.retry_after is not None:
+                headers["Retry-After"] = f"{conf.retry_after:g}"
+            return (
+                429,
+                headers,
+                self._error("Rate limit exceeded", "rate_limit_exceeded"),
+            )
+        if outcome == "server_error":
+            status = rng.choice((500, 502, 503))
+            return status, {}, self._error("Upstream failure", "server_error")
+
+        completion = self.build_completion(request, outcome, body)
+        if request.get("stream"):
+            include_usage = (request.get("stream_options") or {}).get("include_usage")
+            return 200, {}, stream_events(completion, bool(include_usage))
+        return 200, {}, orjson.dumps(completion)
+
+    def _store_file(self, filename: str, purpose: str, data: bytes) -> dict[str, Any]:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        self._file_data[file_id] = data
+        self._files[file_id] = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        return self._files[file_id]
+
+    def upload_file(
+        self, body: bytes, content_type: str
+    ) -> tuple[int, dict[str, str], bytes]:
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+        )
+        fields: dict[str, tuple[str | None, bytes]] = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            fields[name] = (part.get_filename(), part.get_payload(decode=True))
+
+        if "file" not in fields:
+            return 400, {}, self._error("Missing file part", "invalid_request_error")
+
+        filename, data = fields["file"]
+        purpose = fields.get("purpose", (None, b"batch"))[1].decode()
+        return (
+            200,
+            {},
+            orjson.dumps(self._store_file(filename or "upload", purpose, data)),
+        )
+
+    def create_batch(self, body: bytes) -> tuple[int, dict[str, str], bytes]:
+        try:
+            request = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return 400, {}, self._error("Invalid JSON body", "invalid_request_error")
+        if request.get("input_file_id") not in self._file_data:
+            return 404, {}, self._error("Input file not found", "not_found")
+
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        self._batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": request.get("endpoint", "/v1/chat/completions"),
+            "input_file_id": request["input_file_id"],
+            "completion_window": request.get("completion_window", "24h"),
+            "status": "validating",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        task = asyncio.create_task(self._process_batch(batch_id))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+        return 200, {}, orjson.dumps(self._batches[batch_id])
+
+    async def _process_batch(self, batch_id: str) -> None:
+        batch = self._batches[batch_id]
+        lines = self._file_data[batch["input_file_id"]].splitlines()
+        batch["status"] = "in_progress"
+        batch["request_counts"]["total"] = len(lines)
+        await asyncio.sleep(self.config.batch_delay)
+
+        output: list[bytes] = []
+        errors: list[bytes] = []
+        for line in lines:
+            if not line.strip():
+                continue
+            item = orjson.loads(line)
+            body = orjson.dumps(item["body"])
+            conf = self.config.for_model(item["body"].get("model"))
+            outcome = conf.pick_outcome(self._rng(body))
+            self.stats[f"batch_{outcome}"] += 1
+
+            if outcome == "timeout":
+                continue
+            if outcome in ("rate_limit", "server_error"):
+                status = 429 if outcome == "rate_limit" else 500
+                response = {
+                    "status_code": status,
+                    "body": orjson.loads(self._error(outcome, outcome)),
+                }
+                target, counter = errors, "failed"
+            else:
+                completion = self.build_completion(item["body"], outcome, body)
+                response = {"status_code": 200, "body": completion}
+                target, counter = output, "completed"
+
+            target.append(
+                orjson.dumps(
+                    {
+                        "id": f"batch_req_{uuid.uuid4().hex[:24]}",
+                        "custom_id": item["custom_id"],
+                        "response": {
+                            "request_id": uuid.uuid4().hex,
+                            **response,
+                        },
+                        "error": None,
+                    }
+                )
+            )
+            batch["request_counts"][counter] += 1
+
+        if output:
+            stored = self._store_file(
+                f"{batch_id}_output.jsonl", "batch_output", b"\n".join(output) + b"\n"
+            )
+            batch["output_file_id"] = stored["id"]
+        if errors:
+            stored = self._store_file(
+                f"{batch_id}_errors.jsonl", "batch_output", b"\n".join(errors) + b"\n"
+            )
+            batch["error_file_id"] = stored["id"]
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    def build_completion(
+        self, request: dict[str, Any], outcome: str, body: bytes
+    ) -> dict[str, Any]:
+        message: dict[str, Any] = {"role": "assistant", "content": None}
+        finish_reason = "stop"
+        tools = pick_tools(request)
+
+        if outcome == "length":
+            message["content"] = "Ответ обрезан"
+            finish_reason = "length"
+        elif outcome == "content_filter":
+            finish_reason = "content_filter"
+        elif outcome == "text" or not tools:
+            message["content"] = "Текстовый ответ вместо вызова функции"
+        else:
+            message["tool_calls"] = [
+                {
+                    "id": f"call_{uuid.uuid4().hex[:24]}",
+                    "type": "function",
+                    "function": {
+                        "name": tool["name"],
+                        "arguments": orjson.dumps(
+                            synthesize_arguments(tool.get("parameters") or {})
+                        ).decode(),
+                    },
+                }
+                for tool in tools
+            ]
+            finish_reason = "tool_calls"
+
+        completion_tokens = estimate_tokens(orjson.dumps(message))
+        prompt_tokens = estimate_tokens(body)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [
+                {"index": 0, "message": message, "finish_reason": finish_reason}
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+
+def _pieces(text: str) -> list[str]:
+    return [text[i : i + STREAM_PIECE] for i in range(0, len(text), STREAM_PIECE)]
+
+
+def stream_events(completion: dict[str, Any], include_usage: bool) -> list[bytes]:
+    """Разбивает готовый ответ на SSE-события `chat.completion.chunk`."""
+    choice = completion["choices"][0]
+    message = choice["message"]
+
+    deltas: list[dict[str, Any]] = [{"role": "assistant"}]
+    deltas.extend({"content": piece} for piece in _pieces(message["content"] or ""))
+    for index, call in enumerate(message.get("tool_calls") or []):
+        function = call["function"]
+        deltas.append(
+            {
+                "tool_calls": [
+                    {
+                        "index": index,
+                        "id": call["id"],
+                        "type": "function",
+                        "function": {"name": function["name"], "arguments": ""},
+                    }
+                ]
+            }
+        )
+        deltas.extend(
+            {"tool_calls": [{"index": index, "function": {"arguments": piece}}]}
+            for piece in _pieces(function["arguments"])
+        )
+
+    base = {
+        "id": completion["id"],
+        "object": "chat.completion.chunk",
+        "created": completion["created"],
+        "model": completion["model"],
+    }
+    chunks = [
+        {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        for delta in deltas
+    ]
+    chunks.append(
+        {
+            **base,
+            "choices": [
+                {"index": 0, "delta": {}, "finish_reason": choice["finish_reason"]}
+            ],
+        }
+    )
+    if include_usage:
+        chunks.append({**base, "choices": [], "usage": completion["usage"]})
+
+    events = [b"data: " + orjson.dumps(chunk) + b"\n\n" for chunk in chunks]
+    events.append(b"data: [DONE]\n\n")
+    return events
+
+
+def load_stub_config(path: str | None) -> StubConfig:
+    if not path:
+        return StubConfig()
+    with open(Path(path), encoding="utf-8") as f:
+        return StubConfig.model_validate(yaml.safe_load(f) or {})
+
+
+async def serve(config: StubConfig, host: str, port: int) -> None:
+    async with StubServer(config, host, port) as server:
+        print(f"🚀 Stub server: {server.base_url}")
+        await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--config", help="YAML с настройками StubConfig")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(load_stub_config(args.config), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
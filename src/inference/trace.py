@@ -0,0 +1,58 @@
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class TokenUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+
+    def add(self, prompt_tokens: int, completion_tokens: int, total_tokens: int):
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.total_tokens += total_tokens
+
+
+@dataclass(slots=True)
+class RequestTrace:
+    """Сведения об одном запросе, которые `ModelInterface` заполняет по ходу вызова."""
+
+    created: float = field(default_factory=time.perf_counter)
+    queue_wait: float = 0.0
+    rate_limit_wait: float = 0.0
+    latency: float = 0.0
+    retries: int = 0
+    hedged: bool = False
+    usage: TokenUsage = field(default_factory=TokenUsage)
+
+    replayed: bool = False
+    streamed: bool = False
+    aborted: bool = False
+    time_to_first_token: float | None = None
+    time_to_tool_name: float | None = None
+
+    def mark_dequeued(self) -> None:
+        self.queue_wait = time.perf_counter() - self.created
+
+    def for_attempt(self) -> "RequestTrace":
+        """След одной попытки (повтора или дубля): её поля не смешиваются с чужими."""
+        return RequestTrace(created=self.created)
+
+    def adopt(self, attempt: "RequestTrace") -> None:
+        """Переносит сведения попытки, чей ответ (или ошибка) стал итогом запроса."""
+        self.streamed = attempt.streamed
+        self.aborted = attempt.aborted
+        self.time_to_first_token = attempt.time_to_first_token
+        self.time_to_tool_name = attempt.time_to_tool_name
+
+    @property
+    def timings(self) -> dict[str, float]:
+        return {
+            name: round(value, 4)
+            for name, value in (
+                ("time_to_first_token", self.time_to_first_token),
+                ("time_to_tool_name", self.time_to_tool_name),
+            )
+            if value is not None
+        }
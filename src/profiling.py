@@ -0,0 +1,350 @@
+"""Профилирование этапов прогона по запросу (`INPUT_PROFILE`).
+
+`INPUT_PROFILE=1` (или `all`) включает всё, либо перечисляются виды через
+запятую: `cpu` — cProfile и выборка стеков, `memory` — tracemalloc, `loop` —
+задержка event loop. Выключенный профайлер отдаёт общий `nullcontext` и
+возвращает корутины как есть, так что без флага прогон не платит ничего.
+"""
+
+import asyncio
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from collections.abc import Callable, Coroutine, Generator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from src.inference.metrics import percentile
+
+if TYPE_CHECKING:
+    from src.inference.trace import RequestTrace
+
+T = TypeVar("T")
+
+PROFILE_KINDS = frozenset({"cpu", "memory", "loop"})
+# Период выборки стеков для collapsed-файла и проверки задержки event loop
+SAMPLE_INTERVAL = 0.005
+LOOP_LAG_INTERVAL = 0.05
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 15
+
+_DISABLED = nullcontext()
+
+
+def parse_profile_kinds(value: str | None) -> frozenset[str]:
+    value = (value or "").strip().lower()
+    if value in ("", "0", "false", "off", "no"):
+        return frozenset()
+    if value in ("1", "true", "on", "yes", "all"):
+        return PROFILE_KINDS
+    kinds = frozenset(k.strip() for k in value.split(",") if k.strip())
+    if unknown := kinds - PROFILE_KINDS:
+        raise ValueError(
+            f"INPUT_PROFILE: неизвестные виды профилирования {sorted(unknown)}, "
+            f"допустимы {sorted(PROFILE_KINDS)}"
+        )
+    return kinds
+
+
+@dataclass(slots=True)
+class StageProfile:
+    """Результат профилирования одного этапа; файлы — имя → (содержимое, расширение)."""
+
+    name: str
+    wall: float = 0.0
+    tables: dict[str, str] = field(default_factory=dict)
+    files: dict[str, tuple[bytes, str]] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class CallProfile:
+    cell: str
+    wall: float
+    busy: float
+    queue_wait: float = 0.0
+    rate_limit_wait: float = 0.0
+
+    @property
+    def wait(self) -> float:
+        return self.wall - self.busy
+
+
+def _ms(calls: list[CallProfile], attr: str, q: float) -> float:
+    return percentile(sorted(getattr(c, attr) for c in calls), q) * 1000
+
+
+class StackSampler(threading.Thread):
+    """Снимает стек потока раз в `interval` — основа collapsed-файла для flamegraph."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_qualname}")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> str:
+        self._done.set()
+        self.join()
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+class LoopLagMonitor:
+    """Насколько позже заказанного просыпается задача: мера блокировки event loop."""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.lags: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - started - self.interval))
+
+    def start(self) -> bool:
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+        except RuntimeError:
+            return False  # синхронный этап — мерить нечего
+        return True
+
+    def stop(self) -> str:
+        if self._task is not None:
+            self._task.cancel()
+        lags = sorted(self.lags)
+        return (
+            f"samples\t{len(lags)}\n"
+            f"interval_ms\t{self.interval * 1000:g}\n"
+            + "".join(
+                f"p{round(q * 100)}_ms\t{percentile(lags, q) * 1000:.3f}\n"
+                for q in (0.5, 0.95, 0.99)
+            )
+            + f"max_ms\t{(lags[-1] if lags else 0.0) * 1000:.3f}\n"
+        )
+
+
+class _SteppedCoroutine:
+    """Обёртка, которая считает время, проведённое корутиной на event loop.
+
+    Всё остальное время вызова — ожидание: семафор, лимиты, сеть.
+    """
+
+    __slots__ = ("coro", "busy")
+
+    def __init__(self, coro: Coroutine[Any, Any, Any]):
+        self.coro = coro
+        self.busy = 0.0
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        value: Any = None
+        error: BaseException | None = None
+        while True:
+            started = time.perf_counter()
+            try:
+                if error is not None:
+                    yielded = self.coro.throw(error)
+                else:
+                    yielded = self.coro.send(value)
+            except StopIteration as stop:
+                self.busy += time.perf_counter() - started
+                return stop.value
+            finally:
+                error = None
+            self.busy += time.perf_counter() - started
+            try:
+                value = yield yielded
+            except BaseException as e:  # noqa: BLE001 — пробрасывается в корутину
+                value, error = None, e
+
+
+class Profiler:
+    """Профили этапов (`stage`) и вызовов модели (`call`) для отчёта.
+
+    Вложенные этапы не профилируются отдельно: cProfile и tracemalloc
+    глобальны, поэтому профиль снимается с внешнего этапа. Готовый профиль
+    этапа отдаётся в `sink` (в `runner.py` — вложения Allure).
+    """
+
+    def __init__(
+        self,
+        kinds: frozenset[str],
+        sink: Callable[[StageProfile], None] | None = None,
+    ):
+        self.kinds = kinds
+        self.sink = sink
+        self.calls: list[CallProfile] = []
+        self._depth = 0
+
+    @classmethod
+    def from_env(cls, sink: Callable[[StageProfile], None] | None = None) -> "Profiler":
+        return cls(parse_profile_kinds(os.environ.get("INPUT_PROFILE")), sink)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.kinds)
+
+    def stage(self, name: str) -> AbstractContextManager[Any]:
+        if not self.kinds or self._depth:
+            return _DISABLED
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str) -> Generator[StageProfile, None, None]:
+        result = StageProfile(name)
+        profile = cProfile.Profile() if "cpu" in self.kinds else None
+        sampler = StackSampler(threading.get_ident()) if "cpu" in self.kinds else None
+        monitor = LoopLagMonitor() if "loop" in self.kinds else None
+        started_tracing = False
+        if "memory" in self.kinds:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                started_tracing = True
+            tracemalloc.reset_peak()
+
+        monitoring = monitor is not None and monitor.start()
+        if sampler is not None:
+            sampler.start()
+        self._depth += 1
+        started = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield result
+        finally:
+            if profile is not None:
+                profile.disable()
+            result.wall = time.perf_counter() - started
+            self._depth -= 1
+
+            # Снимок памяти — до разбора профиля, чтобы не учитывать его аллокации
+            if "memory" in self.kinds:
+                result.tables["tracemalloc"] = self._memory_table()
+                if started_tracing:
+                    tracemalloc.stop()
+            if sampler is not None:
+                result.files["collapsed stacks"] = (sampler.stop().encode(), "folded")
+            if profile is not None:
+                result.tables["cProfile"] = self._stats_table(profile)
+                result.files["cProfile"] = (self._dump_stats(profile), "prof")
+            if monitoring and monitor is not None:
+                result.tables["Event loop lag"] = monitor.stop()
+
+            if self.sink is not None:
+                self.sink(result)
+
+    @staticmethod
+    def _stats_table(profile: cProfile.Profile) -> str:
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+        return out.getvalue()
+
+    @staticmethod
+    def _dump_stats(profile: cProfile.Profile) -> bytes:
+        # То же, что `dump_stats`, но в память: marshal словаря статистики
+        profile.create_stats()
+        return marshal.dumps(profile.stats)  # type: ignore[attr-defined]
+
+    @staticmethod
+    def _memory_table() -> str:
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ]
+        )
+        top = snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        lines = [
+            f"current_kib\t{current / 1024:.1f}",
+            f"peak_kib\t{peak / 1024:.1f}",
+            "",
+            "size_kib\tcount\tlocation",
+        ]
+        lines += [
+            f"{stat.size / 1024:.1f}\t{stat.count}\t{stat.traceback[0]}" for stat in top
+        ]
+        return "\n".join(lines) + "\n"
+
+    def call(
+        self,
+        cell: str,
+        coro: Coroutine[Any, Any, T],
+        trace: "RequestTrace | None" = None,
+    ) -> Any:
+        """Вызов модели: без профилирования — сама корутина, иначе замер шагов."""
+        if not self.kinds:
+            return coro
+        return self._call(cell, coro, trace)
+
+    async def _call(
+        self,
+        cell: str,
+        coro: Coroutine[Any, Any, T],
+        trace: "RequestTrace | None",
+    ) -> T:
+        stepped = _SteppedCoroutine(coro)
+        started = time.perf_counter()
+        try:
+            return await stepped
+        finally:
+            self.calls.append(
+                CallProfile(
+                    cell=cell,
+                    wall=time.perf_counter() - started,
+                    busy=stepped.busy,
+                    queue_wait=trace.queue_wait if trace else 0.0,
+                    rate_limit_wait=trace.rate_limit_wait if trace else 0.0,
+                )
+            )
+
+    def calls_table(self) -> str:
+        """Сводка по ячейкам, мс.
+
+        `busy` — работа вызова на event loop, `wait` — остальное его время (сеть,
+        лимиты, повторы), `queue` — ожидание слота семафора до вызова.
+        """
+        by_cell: dict[str, list[CallProfile]] = defaultdict(list)
+        for call in self.calls:
+            by_cell[call.cell].append(call)
+
+        header = (
+            f"{'cell':<40} {'calls':>6} {'wall p50':>9} {'wall p95':>9} "
+            f"{'busy p50':>9} {'busy p95':>9} {'queue p95':>9} {'rate p95':>9} "
+            f"{'wait p95':>9}"
+        )
+        lines = [header, "-" * len(header)]
+        for cell, calls in sorted(by_cell.items()):
+            lines.append(
+                f"{cell:<40} {len(calls):>6} {_ms(calls, 'wall', 0.5):>9.2f} "
+                f"{_ms(calls, 'wall', 0.95):>9.2f} {_ms(calls, 'busy', 0.5):>9.2f} "
+                f"{_ms(calls, 'busy', 0.95):>9.2f} "
+                f"{_ms(calls, 'queue_wait', 0.95):>9.2f} "
+                f"{_ms(calls, 'rate_limit_wait', 0.95):>9.2f} "
+                f"{_ms(calls, 'wait', 0.95):>9.2f}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,151 @@
+from typing import TYPE_CHECKING, Any
+
+import orjson
+
+from src.exceptions.custom_exceptions import (
+    BaseFunctionException,
+    EmptyRequiredFields,
+    EnumValueMismatch,
+    LLMGenerationError,
+    TypeMismatchJsonToPython,
+    UnregisterField,
+)
+from src.schema.interfaces import TYPE_MAPPING
+
+if TYPE_CHECKING:
+    from src.schema.json_schema import Schema
+
+
+def _is_type(value: Any, property_type: str) -> bool:
+    # bool — подкласс int, а JSON-число 1.0 допустимо как integer
+    if isinstance(value, bool):
+        return property_type == "boolean"
+    if property_type == "number":
+        return isinstance(value, (int, float))
+    if property_type == "integer":
+        return isinstance(value, int) or (
+            isinstance(value, float) and value.is_integer()
+        )
+    return isinstance(value, TYPE_MAPPING[property_type])
+
+
+def _in_enum(value: Any, enum: tuple, enum_set: frozenset | None) -> bool:
+    if enum_set is not None:
+        try:
+            return value in enum_set
+        except TypeError:
+            pass
+    return value in enum
+
+
+class ArgumentsValidator:
+    """Проверка аргументов tool call, собранная из схемы один раз.
+
+    Проверяются обязательные ключи, лишние ключи, типы по `TYPE_MAPPING` и `enum`.
+    `null` у необязательного ключа считается равным его отсутствию.
+    """
+
+    __slots__ = ("name", "required", "checks")
+
+    def __init__(self, schema: "Schema"):
+        parameters = schema.parameters
+
+        self.name = schema.name
+        self.required = frozenset(parameters.required)
+        self.checks: dict[str, tuple[str | None, tuple | None, frozenset | None]] = {}
+
+        for key, prop in parameters.properties.items():
+            property_type = (
+                prop.property_type if prop.property_type in TYPE_MAPPING else None
+            )
+            enum = tuple(prop.enum) if prop.enum is not None else None
+            enum_set = None
+            if enum is not None:
+                try:
+                    enum_set = frozenset(enum)
+                except TypeError:
+                    pass
+            self.checks[key] = (property_type, enum, enum_set)
+
+    def parse(self, payload: str | bytes | dict) -> dict:
+        if isinstance(payload, dict):
+            return payload
+
+        try:
+            arguments = orjson.loads(payload or b"{}")
+        except orjson.JSONDecodeError as e:
+            raise LLMGenerationError(
+                message="Аргументы вызова не являются корректным JSON",
+                fields={"function": self.name, "error": str(e)},
+            ) from e
+
+        if not isinstance(arguments, dict):
+            raise TypeMismatchJsonToPython(
+                message="Аргументы вызова должны быть JSON-объектом",
+                fields={"function": self.name, "received": type(arguments).__name__},
+            )
+        return arguments
+
+    def errors(self, arguments: dict) -> list[BaseFunctionException]:
+        errors: list[BaseFunctionException] = []
+
+        missing = self.required.difference(
+            key for key, value in arguments.items() if value is not None
+        )
+        if missing:
+            errors.append(
+                EmptyRequiredFields(
+                    message=f"Модель не передала обязательные аргументы '{self.name}'",
+                    fields=sorted(missing),
+                )
+            )
+
+        unknown = []
+        for key, value in arguments.items():
+            check = self.checks.get(key)
+            if check is None:
+                unknown.append(key)
+                continue
+
+            # `null` необязательного ключа — отсутствие, обязательного — уже
+            # учтён в EmptyRequiredFields
+            if value is None:
+                continue
+
+            property_type, enum, enum_set = check
+            if property_type is not None and not _is_type(value, property_type):
+                errors.append(
+                    TypeMismatchJsonToPython(
+                        message=f"Аргумент '{key}' не соответствует типу схемы",
+                        fields={
+                            "key": key,
+                            "expected": property_type,
+                            "received": type(value).__name__,
+                        },
+                    )
+                )
+            elif enum is not None and not _in_enum(value, enum, enum_set):
+                errors.append(
+                    EnumValueMismatch(
+                        message=f"Значение аргумента '{key}' не входит в enum",
+                        fields={"key": key, "value": value, "enum": list(enum)},
+                    )
+                )
+
+        if unknown:
+            errors.append(
+                UnregisterField(
+                    message=f"Модель передала аргументы, которых нет в '{self.name}'",
+                    fields=unknown,
+                )
+            )
+
+        return errors
+
+    def validate(self, payload: str | bytes | dict) -> dict:
+        """Разбирает и проверяет аргументы, возвращая их словарём."""
+        arguments = self.parse(payload)
+        errors = self.errors(arguments)
+        if errors:
+            raise ExceptionGroup("Ошибки в аргументах вызова функции:", errors)
+        return arguments
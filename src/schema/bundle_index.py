@@ -0,0 +1,257 @@
+import mmap
+import os
+import re
+from pathlib import Path
+from typing import Any, Literal
+
+import orjson
+
+BundleLayout = Literal["single", "dict", "list"]
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".idx"
+# Меньшие файлы сканируются заново при каждом открытии, индекс рядом не пишется
+INDEX_MIN_BYTES = 1 << 20
+
+# Строка JSON целиком (с экранированием) или скобка — всё, что нужно сканеру
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]', re.DOTALL)
+_WHITESPACE = b" \t\r\n"
+_NAME_KEY = b'"name"'
+QUOTE, COLON = ord('"'), ord(":")
+
+
+def is_schema_dict(data: Any) -> bool:
+    return isinstance(data, dict) and "name" in data and "parameters" in data
+
+
+def _skip_whitespace(buf: Any, pos: int) -> int:
+    while pos < len(buf) and buf[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _next_byte(buf: Any, pos: int) -> int | None:
+    pos = _skip_whitespace(buf, pos)
+    return buf[pos] if pos < len(buf) else None
+
+
+def scan_bundle(buf: Any) -> tuple[BundleLayout, dict[str, tuple[int, int]]]:
+    """Байтовые границы схем в наборе без разбора их содержимого.
+
+    Понимает одну схему, словарь `{имя: схема}` и список схем (имя берётся из
+    поля `name` элемента). Один проход по строкам и скобкам регулярным
+    выражением; сами схемы не разбираются.
+    """
+    root = _next_byte(buf, 0)
+    layout: BundleLayout = "list" if root == ord("[") else "dict"
+    entries: dict[str, tuple[int, int]] = {}
+
+    depth = 0
+    start = 0
+    entry_key: bytes | None = None
+    top_key: bytes | None = None
+    top_name: bytes | None = None
+    inner_key: bytes | None = None
+    entry_name: bytes | None = None
+
+    def add(key: bytes | None, end: int) -> None:
+        if key is None:
+            return
+        name = orjson.loads(key)
+        if name in entries:
+            raise ValueError(f"Повторяющееся имя функции в наборе: {name}")
+        entries[name] = (start, end)
+
+    for match in _TOKEN.finditer(buf):
+        token = buf[match.start()]
+        if token == QUOTE:
+            # Строки глубже второго уровня — только пропуск содержимого схемы
+            if depth > 2:
+                continue
+            is_key = _next_byte(buf, match.end()) == COLON
+            if depth == 1 and layout == "dict":
+                if is_key:
+                    top_key = match.group()
+                elif top_key == _NAME_KEY:
+                    top_name = match.group()
+            elif depth == 2 and layout == "list":
+                if is_key:
+                    inner_key = match.group()
+                elif inner_key == _NAME_KEY:
+                    entry_name = match.group()
+        elif token == 123 or token == 91:  # { [
+            if depth == 1:
+                start = match.start()
+                entry_key, entry_name, inner_key = top_key, None, None
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 1:
+                add(entry_key if layout == "dict" else entry_name, match.end())
+
+    # Строковое поле `name` на верхнем уровне бывает только у самой схемы
+    if layout == "dict" and top_name is not None:
+        entries = {orjson.loads(top_name): (0, len(buf))}
+        return "single", entries
+    return layout, entries
+
+
+def _object_end(buf: Any, start: int) -> int | None:
+    depth = 0
+    for match in _TOKEN.finditer(buf, start):
+        token = buf[match.start()]
+        if token == QUOTE:
+            continue
+        depth += 1 if token == 123 or token == 91 else -1
+        if depth == 0:
+            return match.end()
+    return None
+
+
+def find_entry(buf: Any, name: str) -> tuple[int, int] | None:
+    """Ищет схему по ключу `name` словаря-набора поиском по байтам, без индекса.
+
+    Правило то же, что у `BundleIndex.read` и `load_schema_dict`: имя — ключ
+    набора, а не поле `name` схемы. Кандидат — вхождение `"name": {`; он
+    принимается, только если вырезанный объект — схема (совпадение с ключом
+    вложенного свойства отсеивается).
+    """
+    needle = orjson.dumps(name)
+    pos = buf.find(needle)
+    while pos != -1:
+        after = _skip_whitespace(buf, pos + len(needle))
+        start = _skip_whitespace(buf, after + 1)
+        if _next_byte(buf, after) == COLON and _next_byte(buf, start) == 123:
+            end = _object_end(buf, start)
+            try:
+                entry = orjson.loads(buf[start:end]) if end is not None else None
+            except orjson.JSONDecodeError:
+                entry = None
+            if is_schema_dict(entry):
+                return start, end
+        pos = buf.find(needle, pos + len(needle))
+    return None
+
+
+class BundleIndex:
+    """Индекс набора схем: имя функции → байтовый диапазон в файле.
+
+    Для больших файлов индекс хранится рядом (`<файл>.idx`) и пересобирается,
+    только если у файла изменились размер или время модификации. Чтение одной
+    схемы — `seek` + `read` её диапазона и разбор только этих байтов.
+    """
+
+    __slots__ = ("path", "layout", "entries")
+
+    def __init__(
+        self, path: Path, layout: BundleLayout, entries: dict[str, tuple[int, int]]
+    ):
+        self.path = path
+        self.layout = layout
+        self.entries = entries
+
+    @staticmethod
+    def sidecar_path(path: Path) -> Path:
+        return path.with_name(path.name + INDEX_SUFFIX)
+
+    @staticmethod
+    def _stamp(path: Path) -> dict[str, int]:
+        stat = path.stat()
+        return {
+            "version": INDEX_VERSION,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+        }
+
+    @classmethod
+    def cached(cls, path: Path) -> "BundleIndex | None":
+        """Индекс из файла рядом, если он есть и соответствует набору."""
+        sidecar = cls.sidecar_path(path)
+        if not sidecar.exists():
+            return None
+        try:
+            data = orjson.loads(sidecar.read_bytes())
+            stamp = cls._stamp(path)
+            if {k: data.get(k) for k in stamp} != stamp:
+                return None
+            entries = {k: tuple(v) for k, v in data["entries"].items()}
+            return cls(path, data["layout"], entries)
+        except (orjson.JSONDecodeError, KeyError, TypeError, AttributeError):
+            return None
+
+    @classmethod
+    def load(cls, path: Path) -> "BundleIndex":
+        """Индекс набора; для больших файлов — из `.idx` или с его записью."""
+        large = path.stat().st_size >= INDEX_MIN_BYTES
+        if large and (index := cls.cached(path)) is not None:
+            return index
+
+        index = cls.build(path)
+        if large:
+            payload = {
+                **cls._stamp(path),
+                "layout": index.layout,
+                "entries": index.entries,
+            }
+            sidecar = cls.sidecar_path(path)
+            tmp = sidecar.with_name(f"{sidecar.name}.{os.getpid()}.tmp")
+            try:
+                tmp.write_bytes(orjson.dumps(payload))
+                os.replace(tmp, sidecar)
+            except OSError:
+                pass  # каталог только для чтения — индекс остаётся в памяти
+        return index
+
+    @classmethod
+    def build(cls, path: Path) -> "BundleIndex":
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return cls(path, "single", {})
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                layout, entries = scan_bundle(buf)
+        return cls(path, layout, entries)
+
+    @property
+    def names(self) -> list[str]:
+        return list(self.entries)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def read_bytes(self, name: str) -> bytes:
+        start, end = self.entries[name]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def read(self, name: str) -> Any:
+        return orjson.loads(self.read_bytes(name))
+
+    def read_single(self) -> Any:
+        """Файл с одной схемой (или нераспознанный) — разбирается целиком."""
+        return orjson.loads(self.path.read_bytes())
+
+
+def read_entry(path: Path, name: str) -> tuple[BundleLayout, Any]:
+    """Схема `name` из большого набора без разбора остальных записей.
+
+    Порядок: готовый `.idx`, поиск по байтам через `mmap` (словарь-набор),
+    затем построение индекса. Для файла с одной схемой возвращается она
+    целиком; `None` — в наборе нет такой функции.
+    """
+    index = BundleIndex.cached(path)
+    if index is None:
+        with (
+            open(path, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf,
+        ):
+            if (span := find_entry(buf, name)) is not None:
+                return "dict", orjson.loads(buf[span[0] : span[1]])
+        index = BundleIndex.load(path)
+
+    if index.layout == "single":
+        return "single", index.read_single()
+    return index.layout, index.read(name) if name in index else None
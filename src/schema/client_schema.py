@@ -12,7 +12,10 @@
 #     return re.sub(pattern, replacer, text)
 
 import inspect
-from typing import Annotated, Any, Literal
+from collections.abc import Iterator
+from functools import cache
+from pathlib import Path
+from typing import Annotated, Any, ClassVar, Literal
 
 from openai.types.chat import ChatCompletionSystemMessageParam
 from pydantic import (
@@ -26,16 +29,60 @@ from pydantic import (
     model_validator,
 )
 
-from src.schema.settings import api_keys_storage
+from src.inference.corpus import QueryRecord, iter_corpus
+from src.inference.limiter import LimiterAlgorithm
+from src.inference.rate_limit import RateLimiter
+from src.inference.replay_cache import ReplayCache, ReplayMode
+from src.inference.retry import LatencyWindow, RetryBudget, RetryPolicy
+from src.inference.trace import TokenUsage
+from src.schema.settings import get_api_keys
+
+
+@cache
+def completion_params() -> frozenset[str] | None:
+    """Параметры `chat.completions.create` текущей версии SDK.
+
+    Сигнатура разбирается один раз за процесс, а не при валидации каждой модели.
+    """
+    try:
+        from openai.resources.chat.completions import AsyncCompletions
+
+        return frozenset(inspect.signature(AsyncCompletions.create).parameters)
+    except (ImportError, AttributeError):
+        return None
+
 
 StrUrl = Annotated[HttpUrl, AfterValidator(lambda v: str(v))]
 
 
+class AdaptiveConfig(BaseModel):
+    algorithm: LimiterAlgorithm = "aimd"
+    initial: int | None = Field(default=None, ge=1)
+    min_limit: int = Field(default=1, ge=1)
+    backoff: float = Field(default=0.5, gt=0.0, lt=1.0)
+    latency_tolerance: float = Field(default=2.0, gt=1.0)
+    smoothing: float = Field(default=0.2, gt=0.0, le=1.0)
+
+
 class ModelConfig(BaseModel):
     model_id: str = Field(alias="name")
     semaphore: int = Field(ge=1)
     max_tokens: int = Field(ge=1)
     temperature: float = Field(ge=0.0, le=2.0)
+    adaptive: AdaptiveConfig | None = None
+    rpm: int | None = Field(default=None, ge=1)
+    tpm: int | None = Field(default=None, ge=1)
+    stream: bool = False
+
+    # Поля настройки клиента, которые не уходят в chat.completions.create
+    CLIENT_FIELDS: ClassVar[set[str]] = {
+        "semaphore",
+        "model_id",
+        "adaptive",
+        "rpm",
+        "tpm",
+        "stream",
+    }
 
     _properties: dict[str, Any] = PrivateAttr(default_factory=dict)
 
@@ -43,39 +90,64 @@ class ModelConfig(BaseModel):
 
     @model_validator(mode="after")
     def filter_extra_params(self) -> "ModelConfig":
-        try:
-            from openai.resources.chat.completions import AsyncCompletions
-
-            sig = inspect.signature(AsyncCompletions.create)
-        except (ImportError, AttributeError):
+        if not self.model_extra:
             return self
-
-        if self.model_extra:
+        allowed = completion_params()
+        if allowed is not None:
             self._properties = {
-                k: v for k, v in self.model_extra.items() if k in sig.parameters
+                k: v for k, v in self.model_extra.items() if k in allowed
             }
         return self
 
     def get_params(self) -> dict[str, Any]:
-        params = self.model_dump(exclude={"semaphore", "model_id"}, exclude_none=True)
+        params = self.model_dump(exclude=self.CLIENT_FIELDS, exclude_none=True)
         params.update(self._properties)
         return params
 
 
+class HedgeConfig(BaseModel):
+    quantile: float = Field(default=0.95, gt=0.5, lt=1.0)
+    min_samples: int = Field(default=20, ge=1)
+
+
 class RouterConfig(BaseModel):
     config_name: str = Field(alias="name")
     base_url: StrUrl
-    model_settings: ModelConfig = Field(alias="models")
+    models: list[ModelConfig] = Field(min_length=1)
     system_prompt: str = Field(alias="role")
 
     timeout: int = Field(default=60, ge=1)
     tool_choice: Literal["none", "auto", "required"] = "auto"
     max_retries: int = Field(default=3, ge=1)
     retry_delay: float = Field(default=1.3, ge=0.5)
+    retry_max_delay: float = Field(default=30.0, gt=0)
+    hedge: HedgeConfig | None = None
+    weight: float = Field(default=1.0, gt=0)
     api_key: SecretStr | None = None
+    rpm: int | None = Field(default=None, ge=1)
+    tpm: int | None = Field(default=None, ge=1)
 
     model_config = ConfigDict(populate_by_name=True)
 
+    @model_validator(mode="before")
+    @classmethod
+    def wrap_single_model(cls, data: Any) -> Any:
+        if isinstance(data, dict) and isinstance(data.get("models"), dict):
+            data = {**data, "models": [data["models"]]}
+        return data
+
+    @model_validator(mode="after")
+    def check_unique_models(self) -> "RouterConfig":
+        names = [m.model_id for m in self.models]
+        if len(names) != len(set(names)):
+            raise ValueError(f"Повторяющиеся модели в роутере {self.config_name}")
+        return self
+
+    @property
+    def model_settings(self) -> ModelConfig:
+        """Первая модель роутера (конфигурации с одной моделью)."""
+        return self.models[0]
+
     @property
     def system_message(self) -> ChatCompletionSystemMessageParam:
         return ChatCompletionSystemMessageParam(
@@ -84,7 +156,7 @@ class RouterConfig(BaseModel):
 
     def model_post_init(self, __context: Any) -> None:
         if not self.api_key:
-            self.api_key = api_keys_storage.get_key_for(self.config_name)
+            self.api_key = get_api_keys().get_key_for(self.config_name)
 
             if not self.api_key:
                 raise ValueError(
@@ -92,13 +164,109 @@ class RouterConfig(BaseModel):
                 )
 
 
+class ReplayCacheConfig(BaseModel):
+    mode: ReplayMode = "off"
+    path: str = ".replay-cache"
+    ttl: float | None = Field(default=None, ge=0)
+    max_entries: int = Field(default=10000, ge=1)
+
+    def build(self) -> ReplayCache | None:
+        if self.mode == "off":
+            return None
+        return ReplayCache(Path(self.path), self.mode, self.ttl, self.max_entries)
+
+
+class CorpusConfig(BaseModel):
+    path: str
+    start: int = Field(default=0, ge=0)
+    stop: int | None = Field(default=None, ge=0)
+
+    @model_validator(mode="after")
+    def check_range(self) -> "CorpusConfig":
+        if self.stop is not None and self.stop < self.start:
+            raise ValueError(f"Пустой диапазон строк набора: {self.start}:{self.stop}")
+        return self
+
+    def iter_records(self) -> Iterator[QueryRecord]:
+        return iter_corpus(Path(self.path), self.start, self.stop)
+
+
+class RetryBudgetConfig(BaseModel):
+    ratio: float = Field(default=0.2, ge=0)
+    min_retries: int = Field(default=10, ge=0)
+
+
+class FailoverConfig(BaseModel):
+    window: int = Field(default=20, ge=1)
+    min_requests: int = Field(default=5, ge=1)
+    error_threshold: float = Field(default=0.5, gt=0.0, le=1.0)
+    cooldown: float = Field(default=30.0, ge=0)
+    smoothing: float = Field(default=0.2, gt=0.0, le=1.0)
+
+
+class ModelPrice(BaseModel):
+    """Цена за миллион токенов, USD."""
+
+    prompt: float = Field(ge=0)
+    completion: float = Field(ge=0)
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.prompt + completion_tokens * self.completion) / 1e6
+
+
+class GuardConfig(BaseModel):
+    max_tokens: int | None = Field(default=None, ge=1)
+    max_cost: float | None = Field(default=None, gt=0)
+    # Ключ — "роутер/модель" или просто имя модели
+    prices: dict[str, ModelPrice] = Field(default_factory=dict)
+    max_error_rate: float | None = Field(default=None, gt=0.0, le=1.0)
+    window: int = Field(default=50, ge=1)
+    min_requests: int = Field(default=20, ge=1)
+
+    @model_validator(mode="after")
+    def check_window(self) -> "GuardConfig":
+        # Окно длиной меньше min_requests никогда не наберёт выборку
+        if self.min_requests > self.window:
+            raise ValueError(
+                f"guard.min_requests ({self.min_requests}) больше guard.window "
+                f"({self.window}): доля ошибок никогда не будет проверена"
+            )
+        return self
+
+    @property
+    def enabled(self) -> bool:
+        return any(
+            limit is not None
+            for limit in (self.max_tokens, self.max_cost, self.max_error_rate)
+        )
+
+    def price_for(self, router: str, model: str) -> ModelPrice | None:
+        return self.prices.get(f"{router}/{model}") or self.prices.get(model)
+
+
+class BatchConfig(BaseModel):
+    poll_interval: float = Field(default=30.0, gt=0)
+    completion_window: Literal["24h"] = "24h"
+    max_requests: int = Field(default=50000, ge=1)
+
+
 class ClientModel(BaseModel):
-    router: RouterConfig
+    routers: list[RouterConfig] = Field(min_length=1)
     queries: list[str] = Field(default_factory=list)
+    corpus: CorpusConfig | None = None
+    mode: Literal["online", "batch"] = "online"
+    routing: Literal["matrix", "failover"] = "matrix"
+    failover: FailoverConfig = Field(default_factory=FailoverConfig)
+    batch: BatchConfig = Field(default_factory=BatchConfig)
+    retry_budget: RetryBudgetConfig = Field(default_factory=RetryBudgetConfig)
+    guard: GuardConfig = Field(default_factory=GuardConfig)
+    replay_cache: ReplayCacheConfig = Field(default_factory=ReplayCacheConfig)
 
-    _request_token: int = PrivateAttr(default=0)
-    _response_token: int = PrivateAttr(default=0)
-    _total_token: int = PrivateAttr(default=0)
+    _usage: TokenUsage = PrivateAttr(default_factory=TokenUsage)
+    _replay: ReplayCache | None = PrivateAttr(default=None)
+    _rate_limiters: dict[str, RateLimiter] = PrivateAttr(default_factory=dict)
+    _retry_budget: RetryBudget | None = PrivateAttr(default=None)
+    _retry_policies: dict[str, RetryPolicy] = PrivateAttr(default_factory=dict)
 
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
@@ -108,6 +276,9 @@ class ClientModel(BaseModel):
         if not isinstance(data, dict):
             return data
 
+        if "router" in data and "routers" not in data:
+            data["routers"] = [data.pop("router")]
+
         if "queries" in data and isinstance(data["queries"], list):
             data["queries"] = [
                 (q.get("query") if isinstance(q, dict) else q)
@@ -116,12 +287,92 @@ class ClientModel(BaseModel):
             ]
         return data
 
+    @model_validator(mode="after")
+    def check_unique_routers(self) -> "ClientModel":
+        names = [r.config_name for r in self.routers]
+        if len(names) != len(set(names)):
+            raise ValueError("Повторяющиеся имена роутеров в конфигурации")
+        if self.corpus is not None and self.queries:
+            raise ValueError("Укажите либо queries, либо corpus, но не оба сразу")
+        if self.routing == "failover" and self.mode == "batch":
+            raise ValueError("Переключение роутеров доступно только в режиме online")
+        if self.guard.max_cost is not None:
+            unpriced = [
+                f"{router.config_name}/{model.model_id}"
+                for router, model in self.matrix
+                if self.guard.price_for(router.config_name, model.model_id) is None
+            ]
+            if unpriced:
+                raise ValueError(f"Нет цены в guard.prices для: {', '.join(unpriced)}")
+        return self
+
+    def model_post_init(self, __context: Any) -> None:
+        self._replay = self.replay_cache.build()
+        self._retry_budget = RetryBudget(
+            self.retry_budget.ratio, self.retry_budget.min_retries
+        )
+
+    @property
+    def router(self) -> RouterConfig:
+        """Первый роутер (конфигурации с одним роутером)."""
+        return self.routers[0]
+
+    @property
+    def matrix(self) -> list[tuple[RouterConfig, ModelConfig]]:
+        """Все ячейки прогона: каждая модель каждого роутера."""
+        return [(router, model) for router in self.routers for model in router.models]
+
+    def iter_queries(self) -> Iterator[QueryRecord]:
+        """Запросы прогона: встроенные в `.yaml` или лениво из JSONL-набора."""
+        if self.corpus is not None:
+            return self.corpus.iter_records()
+        return (QueryRecord(index=i, query=q) for i, q in enumerate(self.queries))
+
+    @property
+    def replay(self) -> ReplayCache | None:
+        return self._replay
+
+    def rate_limiters_for(
+        self, router: RouterConfig, model: ModelConfig
+    ) -> list[RateLimiter]:
+        """Общие на весь прогон лимиты RPM/TPM роутера и модели в нём."""
+        limiters = []
+        for key, conf in (
+            (router.config_name, router),
+            (f"{router.config_name}/{model.model_id}", model),
+        ):
+            if conf.rpm is None and conf.tpm is None:
+                continue
+            if key not in self._rate_limiters:
+                self._rate_limiters[key] = RateLimiter(conf.rpm, conf.tpm)
+            limiters.append(self._rate_limiters[key])
+        return limiters
+
+    def retry_policy_for(self, router: RouterConfig, model: ModelConfig) -> RetryPolicy:
+        """Политика повторов ячейки: общий бюджет прогона, своё окно задержек."""
+        key = f"{router.config_name}/{model.model_id}"
+        if key not in self._retry_policies:
+            self._retry_policies[key] = RetryPolicy(
+                max_retries=router.max_retries,
+                base_delay=router.retry_delay,
+                max_delay=router.retry_max_delay,
+                budget=self._retry_budget,
+                window=LatencyWindow(),
+                hedge=router.hedge,
+            )
+        return self._retry_policies[key]
+
+    @property
+    def usage(self) -> TokenUsage:
+        """Суммарный расход токенов за прогон (без ответов из кэша записи)."""
+        return self._usage
+
     @property
     def usage_report(self) -> str:
         """Красивый отчет о расходе токенов"""
         return (
             f"\n📊 ИТОГО ПОТРАЧЕНО:\n"
-            f"   - Входящие: {self._request_token}\n"
-            f"   - Исходящие: {self._response_token}\n"
-            f"   - Всего:     {self._total_token}"
+            f"   - Входящие: {self._usage.prompt_tokens}\n"
+            f"   - Исходящие: {self._usage.completion_tokens}\n"
+            f"   - Всего:     {self._usage.total_tokens}"
         )
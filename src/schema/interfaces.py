@@ -8,3 +8,6 @@ TYPE_MAPPING = {
     "integer": int,
     "boolean": bool,
 }
+
+# Версия логики проверки синхронизации; повышать при изменении формата результата
+VALIDATOR_VERSION = "1"
@@ -1,3 +1,4 @@
+import copy
 from collections.abc import Sequence
 from typing import Any, Literal
 
@@ -9,6 +10,7 @@ from src.exceptions.custom_exceptions import (
     TypeMismatchJsonToPython,
     UnregisterField,
 )
+from src.schema.arguments_validator import ArgumentsValidator
 from src.schema.interfaces import DEFAULT_REQUIRED_FIELDS_PROPERTIES, TYPE_MAPPING
 
 
@@ -53,7 +55,7 @@ class Property(BaseModel):
     enum: list[Any] | None = Field(default=None)
     default: Any = None
 
-    model_config = ConfigDict(populate_by_name=True, extra="allow")
+    model_config = ConfigDict(populate_by_name=True, extra="allow", frozen=True)
 
 
 class Parameters(BaseModel):
@@ -66,15 +68,46 @@ class Parameters(BaseModel):
         )
     )
 
-    model_config = ConfigDict(populate_by_name=True, extra="allow")
+    model_config = ConfigDict(populate_by_name=True, extra="allow", frozen=True)
 
 
 class Schema(BaseModel):
     name: str
     description: str = Field(min_length=1, max_length=1024)
     parameters: Parameters
-
-    model_config = ConfigDict(extra="allow")
+    _arguments_validator: ArgumentsValidator | None = PrivateAttr(default=None)
+    _tool_param: dict[str, Any] | None = PrivateAttr(default=None)
+
+    # Одна схема разделяется тестами через SchemaRegistry — модели схемы
+    # (и вложенные Parameters/Property) заморожены
+    model_config = ConfigDict(extra="allow", frozen=True)
+
+    @property
+    def arguments_validator(self) -> ArgumentsValidator:
+        """Скомпилированная проверка аргументов tool call (создаётся один раз)."""
+        if self._arguments_validator is None:
+            self._arguments_validator = ArgumentsValidator(self)
+        return self._arguments_validator
+
+    @property
+    def tool_param(self) -> dict[str, Any]:
+        """Описание функции для списка `tools`.
+
+        Собирается один раз, но отдаётся копией: общий словарь не должен
+        меняться через вызывающий код.
+        """
+        if self._tool_param is None:
+            self._tool_param = {
+                "type": "function",
+                "function": {
+                    "name": self.name,
+                    "description": self.description,
+                    "parameters": self.parameters.model_dump(
+                        by_alias=True, exclude_none=True
+                    ),
+                },
+            }
+        return copy.deepcopy(self._tool_param)
 
     @model_validator(mode="after")
     def validate_all_extra_fields(self):
@@ -1,10 +1,18 @@
 import ast
 from dataclasses import dataclass
+from functools import cache
 from inspect import Parameter
 from types import MappingProxyType
 from typing import Any
 
-from pydantic import BaseModel, ConfigDict, PrivateAttr, TypeAdapter, model_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    PrivateAttr,
+    TypeAdapter,
+    ValidationInfo,
+    model_validator,
+)
 
 from src.exceptions.custom_exceptions import (
     DefaultValueMismatch,
@@ -16,13 +24,20 @@ from src.schema.interfaces import TYPE_MAPPING
 from src.schema.json_schema import Schema
 
 
-def normalize_value(val: Any, target_type_str: str) -> Any:
+@cache
+def _type_adapter(target_type_str: str) -> TypeAdapter | None:
+    # Сборка TypeAdapter дороже самой проверки — по одному на тип на процесс
     target_type = TYPE_MAPPING.get(target_type_str)
-    if target_type is None:
+    return TypeAdapter(target_type) if target_type is not None else None
+
+
+def normalize_value(val: Any, target_type_str: str) -> Any:
+    adapter = _type_adapter(target_type_str)
+    if adapter is None:
         return val
 
     try:
-        return TypeAdapter(target_type).validate_python(val)
+        return adapter.validate_python(val)
     except Exception:
         return val
 
@@ -34,6 +49,44 @@ class InfoArg:
     val: Any = None
 
 
+def collect_debug_calls(source_code: str) -> tuple[list[InfoArg], list[str]]:
+    """Собирает вызовы `arguments.get(...)` и имена объявленных функций."""
+    try:
+        tree = ast.parse(source_code)
+    except Exception as e:
+        raise ValueError(f"Ошибка парсинга кода: {e}")  # noqa: B904
+
+    found_args = []
+    all_call_obj = []
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef):
+            all_call_obj.append(node.name)
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "get"
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id == "arguments"
+        ):
+            key_val = ""
+            if len(node.args) > 0 and isinstance(node.args[0], ast.Constant):
+                key_val = node.args[0].value
+
+            default_val = None
+            if len(node.args) > 1 and isinstance(node.args[1], ast.Constant):
+                default_val = node.args[1].value
+            else:
+                for kw in node.keywords:
+                    if kw.arg == "default" and isinstance(kw.value, ast.Constant):
+                        default_val = kw.value.value
+
+            card = InfoArg(stroke=node.lineno, key=key_val, val=default_val)
+            found_args.append(card)
+
+    return found_args, all_call_obj
+
+
 class FunctionSchema(BaseModel):
     arguments: MappingProxyType[str, Parameter] = MappingProxyType({})
     json_schema: Schema
@@ -44,44 +97,16 @@ class FunctionSchema(BaseModel):
     model_config = ConfigDict(extra="ignore", arbitrary_types_allowed=True)
 
     @model_validator(mode="after")
-    def find_debug_calls(self) -> "FunctionSchema":
+    def find_debug_calls(self, info: ValidationInfo) -> "FunctionSchema":
         if not self.source_code:
             return self
 
-        try:
-            tree = ast.parse(self.source_code)
-        except Exception as e:
-            raise ValueError(f"Ошибка парсинга кода: {e}")  # noqa: B904
-
-        found_args = []
-
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                self._all_call_obj.append(node.name)
-            if (
-                isinstance(node, ast.Call)
-                and isinstance(node.func, ast.Attribute)
-                and node.func.attr == "get"
-                and isinstance(node.func.value, ast.Name)
-                and node.func.value.id == "arguments"
-            ):
-                key_val = ""
-                if len(node.args) > 0 and isinstance(node.args[0], ast.Constant):
-                    key_val = node.args[0].value
-
-                default_val = None
-                if len(node.args) > 1 and isinstance(node.args[1], ast.Constant):
-                    default_val = node.args[1].value
-                else:
-                    for kw in node.keywords:
-                        if kw.arg == "default" and isinstance(kw.value, ast.Constant):
-                            default_val = kw.value.value
-
-                card = InfoArg(stroke=node.lineno, key=key_val, val=default_val)
-                found_args.append(card)
-                print(f"Найдено: {card}")
-
-        self._args_map = found_args
+        precomputed = (info.context or {}).get("debug_calls")
+        if precomputed is not None:
+            self._args_map, self._all_call_obj = precomputed
+            return self
+
+        self._args_map, self._all_call_obj = collect_debug_calls(self.source_code)
 
         return self
 
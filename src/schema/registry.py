@@ -0,0 +1,62 @@
+import hashlib
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from src.schema.json_schema import Schema
+from src.schema.tool_bundle import ToolBundle
+from src.sync import loader
+
+
+class SchemaRegistry:
+    """Схемы прогона: каждая читается и проверяется `Schema.model_validate` один раз.
+
+    Ключ — путь к файлу, хэш его содержимого и имя функции из самой схемы;
+    правка файла между обращениями даёт новую запись, а не устаревшую схему.
+    Запрошенное имя (имя файла, `INPUT_FUNC_NAME`, ключ набора) может не
+    совпадать с полем `name`, поэтому оно лишь ссылается на запись. Тест
+    синхронизации и тест инференса получают один и тот же объект `Schema`
+    (его модели заморожены). Небольшой файл набора разбирается один раз на
+    все его функции.
+    """
+
+    def __init__(self):
+        self._schemas: dict[tuple[str, str, str], Schema] = {}
+        self._aliases: dict[tuple[str, str, str], tuple[str, str, str]] = {}
+        self._documents: dict[tuple[str, str], Any] = {}
+        self._digests: dict[tuple[str, int, int], str] = {}
+
+    def digest(self, path: Path) -> str:
+        """sha256 файла; пересчитывается, только если изменились размер или mtime."""
+        stat = path.stat()
+        stamp = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+        if stamp not in self._digests:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                while chunk := f.read(1 << 20):
+                    digest.update(chunk)
+            self._digests[stamp] = digest.hexdigest()
+        return self._digests[stamp]
+
+    def get(self, path: Path, name: str) -> Schema:
+        """Схема функции `name` из файла схемы или набора (см. `load_schema_dict`)."""
+        resolved, digest = str(path.resolve()), self.digest(path)
+        alias = (resolved, digest, name)
+        if alias not in self._aliases:
+            if (resolved, digest) not in self._documents:
+                self._documents[resolved, digest] = loader.load_schema_document(path)
+            data = loader.load_schema_dict(
+                path, name, self._documents[resolved, digest]
+            )
+            own_name = data.get("name") if isinstance(data, dict) else None
+            key = (resolved, digest, str(own_name or name))
+            if key not in self._schemas:
+                self._schemas[key] = Schema.model_validate(data)
+            self._aliases[alias] = key
+        return self._schemas[self._aliases[alias]]
+
+    def bundle(self, path: Path, names: Iterable[str] | None = None) -> ToolBundle:
+        return ToolBundle.from_path(path, names, registry=self)
+
+    def __len__(self) -> int:
+        return len(self._schemas)
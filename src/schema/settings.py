@@ -1,3 +1,5 @@
+from functools import cache
+
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -19,4 +21,7 @@ class ApiKeys(BaseSettings):
         )
 
 
-api_keys_storage = ApiKeys()
+@cache
+def get_api_keys() -> ApiKeys:
+    """Ключи из окружения читаются при первом обращении, а не при импорте."""
+    return ApiKeys()
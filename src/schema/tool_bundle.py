@@ -0,0 +1,101 @@
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, cast
+
+from src.schema.bundle_index import BundleIndex, is_schema_dict
+from src.schema.json_schema import Schema
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletionFunctionToolParam
+
+    from src.schema.registry import SchemaRegistry
+
+
+class ToolBundle:
+    """Набор схем, который уходит в один запрос списком `tools`."""
+
+    __slots__ = ("schemas",)
+
+    def __init__(self, schemas: Iterable[Schema]):
+        self.schemas: dict[str, Schema] = {}
+        for schema in schemas:
+            if schema.name in self.schemas:
+                raise ValueError(f"Повторяющееся имя функции в наборе: {schema.name}")
+            self.schemas[schema.name] = schema
+        if not self.schemas:
+            raise ValueError("Пустой набор функций")
+
+    @classmethod
+    def of(cls, tools: "Schema | ToolBundle") -> "ToolBundle":
+        return tools if isinstance(tools, ToolBundle) else cls([tools])
+
+    @classmethod
+    def from_data(cls, data: Any) -> "ToolBundle":
+        """Одна схема, словарь `{имя: схема}` или список схем."""
+        if is_schema_dict(data):
+            items = [data]
+        elif isinstance(data, dict):
+            items = list(data.values())
+        else:
+            items = list(data)
+        return cls(Schema.model_validate(item) for item in items)
+
+    @classmethod
+    def from_path(
+        cls,
+        path: Path,
+        names: Iterable[str] | None = None,
+        registry: "SchemaRegistry | None" = None,
+    ) -> "ToolBundle":
+        """Файл схемы/набора или каталог с `*.json` (по одной схеме на файл).
+
+        Записи наборов перечисляются по индексу (`BundleIndex`); с `names`
+        читаются только указанные функции, остальные не разбираются. С
+        `registry` схемы берутся из реестра прогона.
+        """
+        if path.is_dir():
+            files = sorted(path.glob("*.json"))
+        else:
+            files = [path]
+
+        wanted = set(names) if names is not None else None
+        schemas: list[Schema] = []
+        for file in files:
+            index = BundleIndex.load(file)
+            for name in index.names:
+                if wanted is not None and name not in wanted:
+                    continue
+                if registry is not None:
+                    schemas.append(registry.get(file, name))
+                elif index.layout == "single":
+                    schemas.append(Schema.model_validate(index.read_single()))
+                else:
+                    schemas.append(Schema.model_validate(index.read(name)))
+
+        if wanted and (missing := wanted - {schema.name for schema in schemas}):
+            raise ValueError(
+                f"Функции не найдены в наборе: {', '.join(sorted(missing))}"
+            )
+        return cls(schemas)
+
+    @property
+    def names(self) -> set[str]:
+        return set(self.schemas)
+
+    def __getitem__(self, name: str) -> Schema:
+        return self.schemas[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.schemas
+
+    def __iter__(self) -> Iterator[Schema]:
+        return iter(self.schemas.values())
+
+    def __len__(self) -> int:
+        return len(self.schemas)
+
+    def tool_params(self) -> list["ChatCompletionFunctionToolParam"]:
+        return [
+            cast("ChatCompletionFunctionToolParam", schema.tool_param)
+            for schema in self
+        ]
@@ -0,0 +1,268 @@
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from src.exceptions import custom_exceptions
+from src.exceptions.custom_exceptions import BaseFunctionException
+from src.schema.bundle_index import BundleIndex
+from src.schema.json_schema import Schema
+from src.schema.py_schema import FunctionSchema, InfoArg, collect_debug_calls
+from src.sync.loader import InspectMode, inspect_function, load_schema_dict
+
+if TYPE_CHECKING:
+    from src.sync.cache import SyncCache
+
+SKIP_DIRS = {"__pycache__", "node_modules", "venv", "site-packages"}
+
+
+@dataclass(slots=True, frozen=True)
+class SyncPair:
+    pair_id: str
+    func_path: Path
+    schema_path: Path
+
+    @property
+    def func_name(self) -> str:
+        return self.func_path.stem
+
+
+@dataclass(slots=True)
+class SyncError:
+    kind: str
+    message: str
+    fields: Any = None
+
+
+@dataclass(slots=True)
+class SyncResult:
+    pair_id: str
+    func_name: str
+    passed: bool = False
+    errors: list[SyncError] = field(default_factory=list)
+    source_code: str = ""
+    schema_json: str = ""
+    args_map: list[InfoArg] = field(default_factory=list)
+    duration: float = 0.0
+    cached: bool = False
+
+    @property
+    def errors_report(self) -> str:
+        return "\n".join(
+            f"- {err.kind}: {err.message} {err.fields or ''}" for err in self.errors
+        )
+
+    def raise_for_errors(self) -> None:
+        """Восстанавливает исключения, пришедшие из процесса-воркера, и пробрасывает их."""
+        if self.passed:
+            return
+
+        rebuilt = []
+        for err in self.errors:
+            exc_type = getattr(custom_exceptions, err.kind, None)
+            if isinstance(exc_type, type) and issubclass(
+                exc_type, BaseFunctionException
+            ):
+                rebuilt.append(exc_type(message=err.message, fields=err.fields))
+            else:
+                rebuilt.append(
+                    BaseFunctionException(message=f"{err.kind}: {err.message}")
+                )
+
+        raise ExceptionGroup("Ошибки валидации и синхронизации", rebuilt)
+
+
+def _is_skipped(path: Path, root: Path) -> bool:
+    return any(
+        part in SKIP_DIRS or part.startswith(".")
+        for part in path.relative_to(root).parts[:-1]
+    )
+
+
+def discover_pairs(root: Path) -> list[SyncPair]:
+    """Находит пары `name.py` ↔ `name.json` под корнем.
+
+    Схема ищется сначала рядом с файлом функции, затем по уникальному имени во всём дереве.
+    """
+    schemas: dict[str, list[Path]] = defaultdict(list)
+    for path in sorted(root.rglob("*.json")):
+        if not _is_skipped(path, root):
+            schemas[path.stem].append(path)
+
+    pairs = []
+    for py_file in sorted(root.rglob("*.py")):
+        if py_file.name == "__init__.py" or _is_skipped(py_file, root):
+            continue
+
+        candidates = schemas.get(py_file.stem, [])
+        sibling = py_file.with_suffix(".json")
+        if sibling in candidates:
+            schema_file = sibling
+        elif len(candidates) == 1:
+            schema_file = candidates[0]
+        else:
+            continue
+
+        pair_id = py_file.relative_to(root).with_suffix("").as_posix()
+        pairs.append(
+            SyncPair(pair_id=pair_id, func_path=py_file, schema_path=schema_file)
+        )
+
+    return pairs
+
+
+def flatten_errors(exc: BaseException) -> list[SyncError]:
+    if isinstance(exc, BaseExceptionGroup):
+        return [err for sub in exc.exceptions for err in flatten_errors(sub)]
+
+    if isinstance(exc, BaseFunctionException):
+        return [
+            SyncError(kind=type(exc).__name__, message=exc.message, fields=exc.fields)
+        ]
+
+    return [SyncError(kind=type(exc).__name__, message=str(exc))]
+
+
+def validate_pair(pair: SyncPair, mode: InspectMode = "import") -> SyncResult:
+    """Полная проверка одной пары; выполняется в процессе-воркере."""
+    started = time.perf_counter()
+    result = SyncResult(pair_id=pair.pair_id, func_name=pair.func_name)
+
+    try:
+        schema_dict = load_schema_dict(pair.schema_path, pair.func_name)
+        result.schema_json = json.dumps(schema_dict, indent=2, ensure_ascii=False)
+        schema = Schema.model_validate(schema_dict)
+
+        source_code, parameters = inspect_function(pair.func_path, pair.func_name, mode)
+        result.source_code = source_code
+
+        debug_calls = collect_debug_calls(source_code)
+        result.args_map = debug_calls[0]
+
+        FunctionSchema.model_validate(
+            {
+                "arguments": parameters,
+                "json_schema": schema,
+                "source_code": source_code,
+            },
+            context={"debug_calls": debug_calls},
+        )
+    except Exception as e:
+        result.errors = flatten_errors(e)
+
+    result.passed = not result.errors
+    result.duration = time.perf_counter() - started
+    return result
+
+
+def _validate_bundle_entries(index: BundleIndex) -> list[SyncResult]:
+    """Проверка части записей набора; выполняется в процессе-воркере."""
+    results = []
+    for name in index.names:
+        started = time.perf_counter()
+        result = SyncResult(pair_id=name, func_name=name)
+        try:
+            data = index.read_single() if index.layout == "single" else index.read(name)
+            result.schema_json = json.dumps(data, indent=2, ensure_ascii=False)
+            Schema.model_validate(data)
+        except Exception as e:
+            result.errors = flatten_errors(e)
+        result.passed = not result.errors
+        result.duration = time.perf_counter() - started
+        results.append(result)
+    return results
+
+
+def validate_bundle(path: Path, workers: int | None = None) -> dict[str, SyncResult]:
+    """Проверяет каждую схему набора `Schema.model_validate` в пуле процессов.
+
+    Индекс строится один раз; воркеру уходит только его часть имён и смещений,
+    записи он читает из файла сам — набор целиком не разбирается нигде.
+    """
+    index = BundleIndex.load(path)
+    names = index.names
+    if not names:
+        return {}
+
+    workers = min(workers or os.cpu_count() or 1, len(names))
+    # Несколько частей на воркер, чтобы тяжёлые схемы не копились в одной
+    size = max(1, -(-len(names) // (workers * 4)))
+    chunks = [
+        BundleIndex(
+            path, index.layout, {n: index.entries[n] for n in names[i : i + size]}
+        )
+        for i in range(0, len(names), size)
+    ]
+
+    if workers == 1:
+        return {
+            r.pair_id: r for chunk in chunks for r in _validate_bundle_entries(chunk)
+        }
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return {
+            r.pair_id: r
+            for results in pool.map(_validate_bundle_entries, chunks)
+            for r in results
+        }
+
+
+def run_batch(
+    pairs: list[SyncPair],
+    workers: int | None = None,
+    cache: "SyncCache | None" = None,
+    mode: InspectMode = "import",
+) -> dict[str, SyncResult]:
+    """Проверяет все пары в пуле процессов и возвращает результаты по `pair_id`.
+
+    Пары, чьи файлы не менялись с прошлого запуска, берутся из кэша без разбора кода.
+    """
+    results: dict[str, SyncResult] = {}
+    keys: dict[str, str] = {}
+    pending = []
+
+    for pair in pairs:
+        if cache is not None:
+            keys[pair.pair_id] = cache.key_for(pair, mode)
+            cached = cache.get(keys[pair.pair_id])
+            if cached is not None:
+                results[pair.pair_id] = cached
+                continue
+        pending.append(pair)
+
+    for result in _validate_all(pending, workers, mode):
+        results[result.pair_id] = result
+        if cache is not None:
+            cache.put(keys[result.pair_id], result)
+
+    if cache is not None:
+        cache.evict()
+
+    return results
+
+
+def _validate_all(pairs: list[SyncPair], workers: int | None, mode: InspectMode):
+    if not pairs:
+        return
+
+    workers = min(workers or os.cpu_count() or 1, len(pairs))
+    if workers == 1:
+        yield from (validate_pair(pair, mode) for pair in pairs)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(validate_pair, pair, mode): pair for pair in pairs}
+        for future in as_completed(futures):
+            pair = futures[future]
+            try:
+                yield future.result()
+            except BaseException as e:  # noqa: B036 — SystemExit/крах воркера
+                yield SyncResult(
+                    pair_id=pair.pair_id,
+                    func_name=pair.func_name,
+                    errors=flatten_errors(e),
+                )
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+from dataclasses import asdict
+from functools import cache
+from pathlib import Path
+
+from src.schema.interfaces import VALIDATOR_VERSION
+from src.schema.py_schema import InfoArg
+from src.sync.batch import SyncError, SyncPair, SyncResult
+
+# Модули, от которых зависит результат проверки (всё, что импортируют
+# `batch` и `loader` из `src`): их правка инвалидирует кэш
+VALIDATOR_MODULES = (
+    "src/exceptions/custom_exceptions.py",
+    "src/schema/arguments_validator.py",
+    "src/schema/bundle_index.py",
+    "src/schema/interfaces.py",
+    "src/schema/json_schema.py",
+    "src/schema/py_schema.py",
+    "src/sync/batch.py",
+    "src/sync/loader.py",
+)
+
+# Ошибки окружения (импорт зависимостей, крах воркера) не определяются хэшами входов
+CACHEABLE_ERRORS = {
+    "ValueError",
+    "ValidationError",
+    "EmptyRequiredFields",
+    "TypeMismatchJsonToPython",
+    "UnregisterField",
+    "MismatchRequiredFieldsInKey",
+    "FunctionNameMismatch",
+    "InvalidFunctionSignature",
+    "SchemaSyncError",
+    "DefaultValueMismatch",
+}
+
+
+@cache
+def validator_fingerprint() -> str:
+    root = Path(__file__).resolve().parents[2]
+    digest = hashlib.sha256(VALIDATOR_VERSION.encode())
+    for module in VALIDATOR_MODULES:
+        digest.update((root / module).read_bytes())
+    return digest.hexdigest()
+
+
+def _file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def pair_cache_key(pair: SyncPair, mode: str = "import") -> str:
+    """Ключ пары: версия валидатора, режим инспекции, имя функции и хэши файлов."""
+    digest = hashlib.sha256()
+    for part in (
+        validator_fingerprint(),
+        mode,
+        pair.func_name,
+        _file_digest(pair.func_path),
+        _file_digest(pair.schema_path),
+    ):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SyncCache:
+    """Дисковый кэш результатов проверки пар: один JSON-файл на ключ, вытеснение по LRU."""
+
+    def __init__(self, path: Path, max_entries: int = 5000, cold: bool = False):
+        self.path = path
+        self.max_entries = max_entries
+        self.cold = cold
+        self.hits = 0
+        self.misses = 0
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "SyncCache | None":
+        cache_dir = os.environ.get("INPUT_CACHE_DIR", ".sync-cache")
+        if not cache_dir:
+            return None
+
+        return cls(
+            Path(cache_dir),
+            max_entries=int(os.environ.get("INPUT_CACHE_MAX_ENTRIES") or 5000),
+            cold=os.environ.get("INPUT_NO_CACHE", "").lower() in {"1", "true", "yes"},
+        )
+
+    def key_for(self, pair: SyncPair, mode: str = "import") -> str:
+        return pair_cache_key(pair, mode)
+
+    def _entry(self, key: str) -> Path:
+        return self.path / f"{key}.json"
+
+    def get(self, key: str) -> SyncResult | None:
+        if self.cold:
+            self.misses += 1
+            return None
+
+        entry = self._entry(key)
+        try:
+            data = json.loads(entry.read_text(encoding="utf-8"))
+            data["errors"] = [SyncError(**err) for err in data["errors"]]
+            data["args_map"] = [InfoArg(**arg) for arg in data["args_map"]]
+            data["cached"] = True
+            result = SyncResult(**data)
+            os.utime(entry)
+        except (OSError, ValueError, KeyError, TypeError):
+            # Битая или устаревшая по формату запись — промах, её перезапишет put
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: SyncResult) -> None:
+        if not all(err.kind in CACHEABLE_ERRORS for err in result.errors):
+            return
+
+        data = asdict(result)
+        data.pop("cached")
+        entry = self._entry(key)
+        tmp = entry.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, default=str), "utf-8")
+        tmp.replace(entry)
+
+    def evict(self) -> int:
+        entries = list(self.path.glob("*.json"))
+        overflow = len(entries) - self.max_entries
+        if overflow <= 0:
+            return 0
+
+        entries.sort(key=lambda p: p.stat().st_mtime)
+        for entry in entries[:overflow]:
+            entry.unlink(missing_ok=True)
+        return overflow
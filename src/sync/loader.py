@@ -0,0 +1,219 @@
+import ast
+import inspect
+import json
+import os
+from importlib.util import module_from_spec, spec_from_file_location
+from inspect import Parameter
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Literal
+
+from src.exceptions.custom_exceptions import FunctionLoadError
+from src.schema.bundle_index import INDEX_MIN_BYTES, is_schema_dict, read_entry
+
+InspectMode = Literal["import", "static"]
+INSPECT_MODES: tuple[InspectMode, ...] = ("import", "static")
+
+
+def is_bundle(data: Any) -> bool:
+    """Набор схем: список или словарь `{имя: схема}` (а не одна схема)."""
+    if isinstance(data, list):
+        return True
+    return (
+        isinstance(data, dict)
+        and bool(data)
+        and "name" not in data
+        and all(isinstance(value, dict) for value in data.values())
+    )
+
+
+def select_schema_entry(data: Any, func_name: str) -> Any:
+    """Схема функции из документа: сама схема, запись набора по имени или ключу."""
+    if not is_bundle(data) or is_schema_dict(data):
+        return data
+    if isinstance(data, dict):
+        return data.get(func_name)
+    return next(
+        (
+            item
+            for item in data
+            if isinstance(item, dict) and item.get("name") == func_name
+        ),
+        None,
+    )
+
+
+def load_schema_document(json_file: Path) -> Any | None:
+    """Документ небольшого файла схем целиком; `None` — файл читается по индексу."""
+    if json_file.stat().st_size >= INDEX_MIN_BYTES:
+        return None
+    with open(json_file, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_schema_dict(json_file: Path, func_name: str, document: Any = None) -> Any:
+    """Схема функции из файла; большой набор не разбирается целиком.
+
+    `document` — уже разобранный `load_schema_document` файл, чтобы не читать
+    его заново для каждой функции набора.
+    """
+    if document is None:
+        document = load_schema_document(json_file)
+    if document is None:
+        _, entry = read_entry(json_file, func_name)
+    else:
+        entry = select_schema_entry(document, func_name)
+
+    if entry is None:
+        raise FunctionLoadError(
+            message=f"Функции '{func_name}' нет в наборе схем",
+            fields={"path": str(json_file), "function": func_name},
+        )
+    return entry
+
+
+def get_func_name(py_file: Path) -> str:
+    """Имя проверяемой функции: `INPUT_FUNC_NAME` или имя файла."""
+    return os.environ.get("INPUT_FUNC_NAME") or py_file.stem
+
+
+def get_function_from_py(py_file: Path, func_name: str):
+    spec = spec_from_file_location(func_name, py_file.absolute())
+    if spec is None or spec.loader is None:
+        raise FunctionLoadError(
+            message=f"Не удалось загрузить модуль из {py_file}",
+            fields={"path": str(py_file)},
+        )
+    mod = module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    if not hasattr(mod, func_name):
+        raise FunctionLoadError(
+            message=f"Функция '{func_name}' не найдена в файле!",
+            fields={"path": str(py_file), "function": func_name},
+        )
+    return getattr(mod, func_name)
+
+
+def get_inspect_mode() -> InspectMode:
+    mode = os.environ.get("INPUT_INSPECT_MODE") or "import"
+    if mode not in INSPECT_MODES:
+        raise FunctionLoadError(
+            message=f"Неизвестный режим инспекции '{mode}'",
+            fields={"available": list(INSPECT_MODES)},
+        )
+    return mode
+
+
+def _literal_or_expr(node: ast.expr | None) -> Any:
+    if node is None:
+        return Parameter.empty
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return ast.unparse(node)
+
+
+def _annotation(node: ast.expr | None) -> Any:
+    return Parameter.empty if node is None else ast.unparse(node)
+
+
+def _build_parameters(args: ast.arguments) -> MappingProxyType[str, Parameter]:
+    params = []
+
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    for i, (arg, default) in enumerate(zip(positional, defaults, strict=True)):
+        kind = (
+            Parameter.POSITIONAL_ONLY
+            if i < len(args.posonlyargs)
+            else Parameter.POSITIONAL_OR_KEYWORD
+        )
+        params.append(
+            Parameter(
+                arg.arg,
+                kind,
+                default=_literal_or_expr(default),
+                annotation=_annotation(arg.annotation),
+            )
+        )
+
+    if args.vararg:
+        params.append(
+            Parameter(
+                args.vararg.arg,
+                Parameter.VAR_POSITIONAL,
+                annotation=_annotation(args.vararg.annotation),
+            )
+        )
+
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults, strict=True):
+        params.append(
+            Parameter(
+                arg.arg,
+                Parameter.KEYWORD_ONLY,
+                default=_literal_or_expr(default),
+                annotation=_annotation(arg.annotation),
+            )
+        )
+
+    if args.kwarg:
+        params.append(
+            Parameter(
+                args.kwarg.arg,
+                Parameter.VAR_KEYWORD,
+                annotation=_annotation(args.kwarg.annotation),
+            )
+        )
+
+    return inspect.Signature(params).parameters
+
+
+def inspect_function_static(
+    py_file: Path, func_name: str
+) -> tuple[str, MappingProxyType[str, Parameter]]:
+    """Аналог `inspect.getsource` + `inspect.signature` только по AST, без exec модуля.
+
+    Значения по умолчанию, которые не являются литералами, возвращаются текстом выражения.
+    """
+    try:
+        source = py_file.read_text(encoding="utf-8")
+        tree = ast.parse(source, filename=str(py_file))
+    except (OSError, SyntaxError, ValueError) as e:
+        raise FunctionLoadError(
+            message=f"Не удалось разобрать модуль {py_file}: {e}",
+            fields={"path": str(py_file)},
+        ) from e
+
+    # Как и при импорте, побеждает последнее определение на уровне модуля
+    node = None
+    for stmt in tree.body:
+        if (
+            isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef))
+            and stmt.name == func_name
+        ):
+            node = stmt
+
+    if node is None:
+        raise FunctionLoadError(
+            message=f"Функция '{func_name}' не найдена в файле!",
+            fields={"path": str(py_file), "function": func_name},
+        )
+
+    start = min([node.lineno, *(dec.lineno for dec in node.decorator_list)])
+    lines = source.splitlines(keepends=True)[start - 1 : node.end_lineno]
+
+    return "".join(lines), _build_parameters(node.args)
+
+
+def inspect_function(
+    py_file: Path, func_name: str, mode: InspectMode = "import"
+) -> tuple[str, Any]:
+    """Возвращает исходный код и параметры сигнатуры функции.
+
+    В режиме `static` модуль не исполняется: код и сигнатура берутся из AST.
+    """
+    if mode == "static":
+        return inspect_function_static(py_file, func_name)
+
+    func = get_function_from_py(py_file, func_name)
+    return inspect.getsource(func), inspect.signature(func).parameters
@@ -0,0 +1,44 @@
+from src.bench.suite import compare
+
+
+def _results(ops_per_s: float, p95_ms: float) -> dict:
+    return {
+        "benchmarks": {
+            "schema_validate": {"ops_per_s": ops_per_s, "p50_ms": 1.0, "p95_ms": p95_ms}
+        }
+    }
+
+
+BASELINE = _results(ops_per_s=100.0, p95_ms=10.0)
+
+
+def test_within_threshold_is_not_a_regression():
+    assert compare(BASELINE, _results(ops_per_s=81.0, p95_ms=11.9), 0.2) == []
+
+
+def test_throughput_drop_beyond_threshold():
+    regressions = compare(BASELINE, _results(ops_per_s=79.0, p95_ms=10.0), 0.2)
+    assert len(regressions) == 1
+    assert "ops/s" in regressions[0]
+
+
+def test_p95_growth_beyond_threshold():
+    regressions = compare(BASELINE, _results(ops_per_s=100.0, p95_ms=12.1), 0.2)
+    assert len(regressions) == 1
+    assert "p95" in regressions[0]
+
+
+def test_benchmark_missing_from_current_run_is_a_regression():
+    regressions = compare(BASELINE, {"benchmarks": {}}, 0.2)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("schema_validate")
+
+
+def test_new_benchmark_without_baseline_is_ignored():
+    current = {
+        "benchmarks": {
+            **BASELINE["benchmarks"],
+            "new": BASELINE["benchmarks"]["schema_validate"],
+        }
+    }
+    assert compare(BASELINE, current, 0.2) == []
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from src.bench.generators import make_schema
+from src.schema.bundle_index import BundleIndex, find_entry, read_entry
+
+
+def _schema(name: str) -> dict:
+    schema = make_schema(5, name=name)
+    # Строки со скобками, кавычками и вложенное свойство `name` не должны
+    # сбивать сканер
+    schema["description"] = 'Скобки { [ ] } и "кавычки" в описании'
+    schema["parameters"]["properties"]["name"] = {
+        "type": "string",
+        "description": "Вложенное поле name",
+    }
+    return schema
+
+
+BUNDLES = {
+    "single": _schema("only"),
+    "dict": {name: _schema(name) for name in ("alpha", "beta", "gamma")},
+    "list": [_schema(name) for name in ("alpha", "beta", "gamma")],
+}
+
+
+def _expected(data) -> dict:
+    if isinstance(data, list):
+        return {item["name"]: item for item in data}
+    if "parameters" in data:
+        return {data["name"]: data}
+    return data
+
+
+@pytest.mark.parametrize("layout", list(BUNDLES))
+def test_index_matches_json_load(tmp_path, layout):
+    path = tmp_path / "bundle.json"
+    path.write_text(json.dumps(BUNDLES[layout], ensure_ascii=False, indent=2), "utf-8")
+    expected = _expected(json.load(path.open(encoding="utf-8")))
+
+    index = BundleIndex.build(path)
+
+    assert index.layout == layout
+    assert index.names == list(expected)
+    for name, schema in expected.items():
+        entry = index.read_single() if layout == "single" else index.read(name)
+        assert entry == schema
+        assert read_entry(path, name)[1] == schema
+
+
+def test_read_entry_missing_function(tmp_path):
+    path = tmp_path / "bundle.json"
+    path.write_text(json.dumps(BUNDLES["list"]), "utf-8")
+
+    assert read_entry(path, "missing") == ("list", None)
+
+
+def test_dict_key_differs_from_schema_name(tmp_path):
+    path = tmp_path / "bundle.json"
+    bundle = {"weather": _schema("get_weather"), "get_weather": _schema("other")}
+    path.write_text(json.dumps(bundle), "utf-8")
+
+    index = BundleIndex.build(path)
+
+    for key, schema in bundle.items():
+        assert index.read(key) == schema
+        assert find_entry(path.read_bytes(), key) is not None
+        assert read_entry(path, key)[1] == schema
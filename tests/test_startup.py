@@ -0,0 +1,6 @@
+from src.bench.startup import budget_from_env, check
+
+
+def test_sync_path_import_within_budget():
+    median, problems = check(runs=3, budget=budget_from_env())
+    assert not problems, f"медиана {median:.1f} мс: " + "; ".join(problems)